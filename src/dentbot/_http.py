@@ -0,0 +1,27 @@
+"""
+HTTP istemcileri için ortak ayarlar (LLM istemcileri ve Telegram botları).
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+
+# Bot API havuzu; NotificationService toplu gönderimde aynı anda en fazla 30 istek uçurur,
+# bu yüzden havuz ondan küçük olmamalı (aksi halde istekler havuzda sıra bekler). Doktor
+# bildirimleri de panel Bot'unun keep-alive bağlantılarını kullanır.
+TELEGRAM_POOL_SIZE = 32
+TELEGRAM_POOL_TIMEOUT = 5.0
+
+
+@lru_cache(maxsize=1)
+def http2_available() -> bool:
+    """HTTP/2 (tek bağlantıda çoklama) yalnızca opsiyonel h2 paketi kuruluysa açılır."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def http_version() -> str:
+    """python-telegram-bot HTTPXRequest'in beklediği sürüm metni: "2" veya "1.1"."""
+    return "2" if http2_available() else "1.1"
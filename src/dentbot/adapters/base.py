@@ -17,6 +17,10 @@ class AppointmentAdapter(Protocol):
         """Veritabanı şemasını başlatır ve gerekirse tabloları oluşturur."""
         ...
 
+    def close(self) -> None:
+        """Açık bağlantıları serbest bırakır (uygulama kapanırken çağrılır)."""
+        ...
+
     # ------------------------------------
     # Dentist CRUD
     # ------------------------------------
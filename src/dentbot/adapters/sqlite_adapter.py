@@ -1,111 +1,244 @@
 from __future__ import annotations
 
 import sqlite3
-import json
+import threading
 import logging
+import weakref
+from contextlib import contextmanager
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, quote
 
 from dentbot.exceptions import DatabaseError
 
 logger = logging.getLogger(__name__)
 
+# ------------------------------------
+# Şema
+# ------------------------------------
+_CREATE_DENTISTS = """
+CREATE TABLE IF NOT EXISTS dentists (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    full_name TEXT NOT NULL,
+    specialty TEXT NOT NULL,
+    phone TEXT,
+    email TEXT,
+    telegram_chat_id INTEGER,
+    working_days TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    break_start TEXT,
+    break_end TEXT,
+    slot_duration INTEGER NOT NULL DEFAULT 30,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+_CREATE_TREATMENTS = """
+CREATE TABLE IF NOT EXISTS treatments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    duration_minutes INTEGER NOT NULL,
+    price REAL,
+    description TEXT,
+    requires_approval INTEGER NOT NULL DEFAULT 1,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+_CREATE_APPOINTMENTS = """
+CREATE TABLE IF NOT EXISTS appointments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dentist_id INTEGER NOT NULL,
+    patient_name TEXT NOT NULL,
+    patient_phone TEXT NOT NULL,
+    patient_email TEXT NOT NULL,
+    appointment_date TEXT NOT NULL,
+    time_slot TEXT NOT NULL,
+    treatment_type TEXT NOT NULL,
+    duration_minutes INTEGER NOT NULL,
+    notes TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    patient_chat_id INTEGER,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY(dentist_id) REFERENCES dentists(id)
+)
+"""
+
+SCHEMA_STATEMENTS = (_CREATE_DENTISTS, _CREATE_TREATMENTS, _CREATE_APPOINTMENTS)
+
+# ------------------------------------
+# Sabit listeleme sorguları
+# ------------------------------------
+# Her filtre değeri için SQL metni sabittir; böylece çalışma anında string
+# birleştirme yapılmaz ve aynı metin bağlantının statement cache'inde kalır.
+LIST_DENTISTS_SQL = {
+    True: "SELECT * FROM dentists WHERE is_active = 1 ORDER BY id DESC",
+    False: "SELECT * FROM dentists WHERE is_active = 0 ORDER BY id DESC",
+    None: "SELECT * FROM dentists ORDER BY id DESC",
+}
+
+LIST_TREATMENTS_SQL = {
+    True: "SELECT * FROM treatments WHERE is_active = 1 ORDER BY id DESC",
+    False: "SELECT * FROM treatments WHERE is_active = 0 ORDER BY id DESC",
+    None: "SELECT * FROM treatments ORDER BY id DESC",
+}
+
+LIST_APPOINTMENTS_SQL = "SELECT * FROM appointments ORDER BY id DESC"
+LIST_APPOINTMENTS_BY_STATUS_SQL = "SELECT * FROM appointments WHERE status = ? ORDER BY id DESC"
+
+# (tarih var mı, doktor var mı, durum var mı) -> sorgu
+LIST_APPOINTMENTS_FILTERED_SQL = {
+    (True, False, False): "SELECT * FROM appointments WHERE appointment_date = ? ORDER BY time_slot",
+    (True, True, False): "SELECT * FROM appointments WHERE appointment_date = ? AND dentist_id = ? ORDER BY time_slot",
+    (False, True, False): "SELECT * FROM appointments WHERE dentist_id = ? ORDER BY id DESC",
+    (False, True, True): "SELECT * FROM appointments WHERE dentist_id = ? AND status = ? ORDER BY id DESC",
+}
+
+# URL'de kabul edilen PRAGMA synchronous değerleri
+_SYNCHRONOUS_MODES = frozenset({"OFF", "NORMAL", "FULL", "EXTRA"})
+
+# Sabit sorgular + dinamik INSERT/UPDATE varyantları için yeterli pay.
+STATEMENT_CACHE_SIZE = 256
+
+
+_column_name = itemgetter(0)
+
+
+def _dict_row_factory(cursor: sqlite3.Cursor, row: tuple) -> Dict[str, Any]:
+    """
+    Satırı ara bir sqlite3.Row nesnesi üretmeden doğrudan dict'e çevirir.
+    Yalnızca satır okuyan cursor'lara atanır; yazma yolları ham cursor kullanır.
+    """
+    return dict(zip(map(_column_name, cursor.description), row))
+
+
+def _close_connections(connections: set, lock: threading.Lock) -> None:
+    with lock:
+        pending = list(connections)
+        connections.clear()
+    for conn in pending:
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            logger.warning("SQLite bağlantısı kapatılamadı: %s", e)
+
+
 class SQLiteAppointmentAdapter:
     """SQLite veritabanı için tam kapsamlı randevu ve klinik veri adaptörü."""
     
     def __init__(self, db_url: str):
-        # Format: sqlite:///path
+        # Format: sqlite:///path[?vfs=isim][&synchronous=normal]
         if db_url.startswith("sqlite:///"):
             self.db_path = db_url.replace("sqlite:///", "")
         else:
             self.db_path = db_url
-            
-        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-        logger.info(f"SQLiteAdapter başlatıldı. Veritabanı yolu: {self.db_path}")
+
+        # Opsiyonel VFS (örn. önceden yüklenmiş io_uring VFS'i): ?vfs=io_uring
+        self.db_path, _, query = self.db_path.partition("?")
+        options = parse_qs(query)
+        self.vfs: Optional[str] = options.get("vfs", [None])[0]
+        # Opsiyonel PRAGMA synchronous (örn. ?synchronous=normal). Varsayılan SQLite'ınki (FULL)
+        # kalır: WAL + NORMAL daha az fsync yapar ama elektrik kesintisinde son commit'ler
+        # kaybolabilir, bu yüzden randevu verisi için yalnızca bilinçli olarak açılmalı.
+        synchronous = options.get("synchronous", [None])[0]
+        if synchronous is not None and synchronous.upper() not in _SYNCHRONOUS_MODES:
+            raise DatabaseError(f"Geçersiz synchronous değeri: {synchronous}")
+        self.synchronous: Optional[str] = synchronous.upper() if synchronous else None
+
+        # sqlite3 bağlantıları thread'ler arası paylaşılamaz; her thread kendi bağlantısını tutar.
+        self._local = threading.local()
+        # Açılan tüm bağlantılar: close() (veya adaptör toplanınca/süreç kapanırken finalizer)
+        # worker thread'lerinin bağlantılarını da kapatır.
+        self._connections: set = set()
+        self._connections_lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, _close_connections, self._connections, self._connections_lock)
+
+        logger.info("SQLiteAdapter başlatıldı. Veritabanı yolu: %s", self.db_path)
 
     def _conn(self) -> sqlite3.Connection:
-        """Veritabanı bağlantısını döndürür ve row_factory'yi ayarlar."""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
+        """
+        Thread'e ait bağlantıyı döndürür; yoksa açar.
+        Bağlantı çağrılar arasında yaşadığı için hazırlanmış ifadeler (statement cache) tekrar kullanılır.
+        """
+        conn = getattr(self._local, "conn", None)
+        # close() sonrası thread'de kalan (kapatılmış) bağlantı yeniden kullanılmaz
+        if conn is not None and conn in self._connections:
             return conn
+        try:
+            # Bağlantı yalnızca kendi thread'inde kullanılır; check_same_thread=False sadece
+            # close()'un başka bir thread'den kapatabilmesi içindir.
+            if self.vfs:
+                # URI'de yol kaçırılır; '?', '#' veya '%' içeren yollar sorgu kısmına taşmaz
+                uri = f"file:{quote(self.db_path)}?vfs={quote(self.vfs, safe='')}"
+                conn = sqlite3.connect(uri, uri=True, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+            else:
+                conn = sqlite3.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+            if self.synchronous:
+                conn.execute(f"PRAGMA synchronous={self.synchronous}")
         except sqlite3.Error as e:
-            logger.error(f"Veritabanı bağlantı hatası: {e}")
+            logger.error("Veritabanı bağlantı hatası: %s", e)
             raise DatabaseError(f"Veritabanına bağlanılamadı: {e}") from e
+        with self._connections_lock:
+            self._connections.add(conn)
+        self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        """Tüm thread'lerin açtığı bağlantıları kapatır; sonraki çağrılar yeni bağlantı açar."""
+        _close_connections(self._connections, self._connections_lock)
+
+    @contextmanager
+    def _writing(self) -> Iterator[sqlite3.Connection]:
+        """
+        Yazma bloğu: başarıda commit, hatada rollback. transaction() içindeyken
+        commit/rollback dış bloğa bırakılır.
+        """
+        conn = self._conn()
+        if getattr(self._local, "in_transaction", False):
+            yield conn
+            return
+        with conn:
+            yield conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Blok içindeki tüm yazmaları tek commit'te (tek fsync) toplar; hata olursa hepsi geri alınır.
+        İç içe kullanımda en dıştaki blok commit eder.
+        """
+        conn = self._conn()
+        if getattr(self._local, "in_transaction", False):
+            yield conn
+            return
+        self._local.in_transaction = True
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._local.in_transaction = False
 
     # ------------------------------------
     # Lifecycle
     # ------------------------------------
     def init(self) -> None:
         """Tabloları eksiksiz oluşturur."""
+        # Dizin oluşturma constructor yerine burada: adapter üretmek dosya sistemine dokunmamalı.
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
         logger.info("Veritabanı tabloları kontrol ediliyor/oluşturuluyor...")
         try:
-            with self._conn() as conn:
+            with self._writing() as conn:
                 cur = conn.cursor()
-                
-                # 1. DENTIST Tablosu
-                cur.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS dentists (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        full_name TEXT NOT NULL,
-                        specialty TEXT NOT NULL,
-                        phone TEXT,
-                        email TEXT,
-                        telegram_chat_id INTEGER,
-                        working_days TEXT NOT NULL, 
-                        start_time TEXT NOT NULL,    
-                        end_time TEXT NOT NULL,      
-                        break_start TEXT,
-                        break_end TEXT,
-                        slot_duration INTEGER NOT NULL DEFAULT 30,
-                        is_active INTEGER NOT NULL DEFAULT 1,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )
-                    """
-                )
-
-                # 2. TREATMENT Tablosu
-                cur.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS treatments (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT NOT NULL UNIQUE,
-                        duration_minutes INTEGER NOT NULL,
-                        price REAL,
-                        description TEXT,
-                        requires_approval INTEGER NOT NULL DEFAULT 1,
-                        is_active INTEGER NOT NULL DEFAULT 1,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )
-                    """
-                )
-
-                # 3. APPOINTMENT Tablosu
-                cur.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS appointments (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        dentist_id INTEGER NOT NULL,
-                        patient_name TEXT NOT NULL,
-                        patient_phone TEXT NOT NULL,
-                        patient_email TEXT NOT NULL,
-                        appointment_date TEXT NOT NULL, 
-                        time_slot TEXT NOT NULL,        
-                        treatment_type TEXT NOT NULL,   
-                        duration_minutes INTEGER NOT NULL,
-                        notes TEXT,
-                        status TEXT NOT NULL DEFAULT 'pending',
-                        patient_chat_id INTEGER,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY(dentist_id) REFERENCES dentists(id)
-                    )
-                    """
-                )
-                conn.commit()
+                # journal_mode kalıcıdır; dosya başına bir kez ayarlamak yeterli.
+                cur.execute("PRAGMA journal_mode=WAL")
+                for statement in SCHEMA_STATEMENTS:
+                    cur.execute(statement)
                 logger.info("Tablo başlatma işlemi başarıyla tamamlandı.")
         except sqlite3.Error as e:
-            logger.error(f"Tablo başlatma sırasında SQLite hatası: {e}")
+            logger.error("Tablo başlatma sırasında SQLite hatası: %s", e)
             raise DatabaseError(f"Tablo başlatma hatası: {e}") from e
 
     # ------------------------------------
@@ -113,69 +246,62 @@ class SQLiteAppointmentAdapter:
     # ------------------------------------
     def _get_by_id(self, table_name: str, id_value: int) -> Optional[Dict[str, Any]]:
         try:
-            with self._conn() as conn:
-                cur = conn.cursor()
-                cur.execute(f"SELECT * FROM {table_name} WHERE id = ?", (id_value,))
-                row = cur.fetchone()
-                return dict(row) if row else None
+            conn = self._conn()
+            cur = conn.cursor()
+            cur.row_factory = _dict_row_factory
+            cur.execute(f"SELECT * FROM {table_name} WHERE id = ?", (id_value,))
+            return cur.fetchone()
         except sqlite3.Error as e:
-            logger.error(f"{table_name} tablosundan ID:{id_value} çekilirken hata: {e}")
+            logger.error("%s tablosundan ID:%s çekilirken hata: %s", table_name, id_value, e)
             return None
             
-    def _list_all(self, table_name: str, where_clause: Optional[str] = None, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
+    def _list_all(self, table_name: str, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
         try:
-            with self._conn() as conn:
-                cur = conn.cursor()
-                query = f"SELECT * FROM {table_name}"
-                if where_clause:
-                    query += f" WHERE {where_clause}"
-                query += " ORDER BY id DESC"
-                cur.execute(query, params or ())
-                return [dict(r) for r in cur.fetchall()]
+            conn = self._conn()
+            cur = conn.cursor()
+            cur.row_factory = _dict_row_factory
+            cur.execute(query, params)
+            return cur.fetchall()
         except sqlite3.Error as e:
-            logger.error(f"{table_name} listelenirken hata: {e}")
+            logger.error("%s listelenirken hata: %s", table_name, e)
             return []
 
     # ------------------------------------
     # Dentist CRUD
     # ------------------------------------
     def create_dentist(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        logger.info(f"Yeni doktor oluşturuluyor: {data.get('full_name')}")
+        logger.info("Yeni doktor oluşturuluyor: %s", data.get('full_name'))
         try:
-            with self._conn() as conn:
+            with self._writing() as conn:
                 cur = conn.cursor()
                 fields = ', '.join(data.keys())
                 placeholders = ', '.join('?' * len(data))
                 values = tuple(data.values())
                 cur.execute(f"INSERT INTO dentists ({fields}) VALUES ({placeholders})", values)
                 dentist_id = cur.lastrowid
-                conn.commit()
                 return self._get_by_id('dentists', dentist_id) or {"id": dentist_id}
         except sqlite3.Error as e:
-            logger.error(f"Doktor oluşturma hatası: {e}")
+            logger.error("Doktor oluşturma hatası: %s", e)
             raise DatabaseError(f"Doktor oluşturulamadı: {e}")
 
     def get_dentist(self, dentist_id: int) -> Optional[Dict[str, Any]]:
         return self._get_by_id('dentists', dentist_id)
 
     def list_dentists(self, is_active: Optional[bool] = True) -> List[Dict[str, Any]]:
-        where = "is_active = ?" if is_active is not None else None
-        params = (1,) if is_active is True else (0,) if is_active is False else None
-        return self._list_all('dentists', where, params)
+        return self._list_all('dentists', LIST_DENTISTS_SQL[is_active])
         
     def update_dentist(self, dentist_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         if not data: return self.get_dentist(dentist_id)
-        logger.info(f"Doktor ID:{dentist_id} güncelleniyor: {list(data.keys())}")
+        logger.info("Doktor ID:%s güncelleniyor: %s", dentist_id, list(data.keys()))
         try:
-            with self._conn() as conn:
+            with self._writing() as conn:
                 cur = conn.cursor()
                 set_clause = ', '.join([f"{k} = ?" for k in data.keys()])
                 values = tuple(data.values()) + (dentist_id,)
                 cur.execute(f"UPDATE dentists SET {set_clause} WHERE id = ?", values)
-                conn.commit()
                 return self.get_dentist(dentist_id)
         except sqlite3.Error as e:
-            logger.error(f"Doktor güncelleme hatası: {e}")
+            logger.error("Doktor güncelleme hatası: %s", e)
             return None
 
     def update_dentist_chat_id(self, dentist_id: int, chat_id: int) -> Optional[Dict[str, Any]]:
@@ -184,10 +310,9 @@ class SQLiteAppointmentAdapter:
 
     def delete_dentist(self, dentist_id: int) -> bool:
         try:
-            with self._conn() as conn:
+            with self._writing() as conn:
                 cur = conn.cursor()
                 cur.execute("DELETE FROM dentists WHERE id = ?", (dentist_id,))
-                conn.commit()
                 return cur.rowcount > 0
         except sqlite3.Error:
             return False
@@ -196,19 +321,18 @@ class SQLiteAppointmentAdapter:
     # Treatment CRUD
     # ------------------------------------
     def create_treatment(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        logger.info(f"Yeni tedavi ekleniyor: {data.get('name')}")
+        logger.info("Yeni tedavi ekleniyor: %s", data.get('name'))
         try:
-            with self._conn() as conn:
+            with self._writing() as conn:
                 cur = conn.cursor()
                 fields = ', '.join(data.keys())
                 placeholders = ', '.join('?' * len(data))
                 values = tuple(data.values())
                 cur.execute(f"INSERT INTO treatments ({fields}) VALUES ({placeholders})", values)
                 tid = cur.lastrowid
-                conn.commit()
                 return self._get_by_id('treatments', tid) or {"id": tid}
         except sqlite3.IntegrityError as e:
-            logger.warning(f"Tedavi zaten mevcut: {data.get('name')}")
+            logger.warning("Tedavi zaten mevcut: %s", data.get('name'))
             raise DatabaseError(f"Tedavi zaten mevcut: {e}")
         except sqlite3.Error as e:
             raise DatabaseError(f"Tedavi oluşturma hatası: {e}")
@@ -217,50 +341,56 @@ class SQLiteAppointmentAdapter:
         return self._get_by_id('treatments', treatment_id)
 
     def list_treatments(self, is_active: Optional[bool] = True) -> List[Dict[str, Any]]:
-        where = "is_active = ?" if is_active is not None else None
-        params = (1,) if is_active is True else (0,) if is_active is False else None
-        return self._list_all('treatments', where, params)
+        return self._list_all('treatments', LIST_TREATMENTS_SQL[is_active])
 
     # ------------------------------------
     # Appointment CRUD
     # ------------------------------------
     def create_appointment(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        logger.info(f"Yeni randevu kaydı denemesi: Hasta {data.get('patient_name')}")
+        logger.info("Yeni randevu kaydı denemesi: Hasta %s", data.get('patient_name'))
         try:
-            with self._conn() as conn:
+            with self._writing() as conn:
                 cur = conn.cursor()
                 fields = ', '.join(data.keys())
                 placeholders = ', '.join('?' * len(data))
                 values = tuple(data.values())
                 cur.execute(f"INSERT INTO appointments ({fields}) VALUES ({placeholders})", values)
                 app_id = cur.lastrowid
-                conn.commit()
-                logger.info(f"Randevu başarıyla oluşturuldu. ID: {app_id}")
+                logger.info("Randevu başarıyla oluşturuldu. ID: %s", app_id)
                 return self._get_by_id('appointments', app_id) or {"id": app_id}
         except sqlite3.Error as e:
-            logger.error(f"Randevu oluşturma hatası: {e}")
+            logger.error("Randevu oluşturma hatası: %s", e)
             raise DatabaseError(f"Randevu kaydedilemedi: {e}")
 
     def get_appointment(self, appointment_id: int) -> Optional[Dict[str, Any]]:
         return self._get_by_id('appointments', appointment_id)
 
     def list_appointments(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
-        where = "status = ?" if status else None
-        params = (status,) if status else None
-        return self._list_all('appointments', where, params)
+        if status:
+            return self._list_all('appointments', LIST_APPOINTMENTS_BY_STATUS_SQL, (status,))
+        return self._list_all('appointments', LIST_APPOINTMENTS_SQL)
+
+    def list_appointments_by_dentist(self, dentist_id: int, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        if status is not None:
+            return self._list_all('appointments', LIST_APPOINTMENTS_FILTERED_SQL[(False, True, True)], (dentist_id, status))
+        return self._list_all('appointments', LIST_APPOINTMENTS_FILTERED_SQL[(False, True, False)], (dentist_id,))
+
+    def list_appointments_by_date(self, date: str, dentist_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        if dentist_id is not None:
+            return self._list_all('appointments', LIST_APPOINTMENTS_FILTERED_SQL[(True, True, False)], (date, dentist_id))
+        return self._list_all('appointments', LIST_APPOINTMENTS_FILTERED_SQL[(True, False, False)], (date,))
 
     def update_appointment(self, appointment_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        logger.info(f"Randevu ID:{appointment_id} güncelleniyor. Yeni durum: {data.get('status')}")
+        logger.info("Randevu ID:%s güncelleniyor. Yeni durum: %s", appointment_id, data.get('status'))
         try:
-            with self._conn() as conn:
+            with self._writing() as conn:
                 cur = conn.cursor()
                 set_clause = ', '.join([f"{k} = ?" for k in data.keys()])
                 values = tuple(data.values()) + (appointment_id,)
                 cur.execute(f"UPDATE appointments SET {set_clause} WHERE id = ?", values)
-                conn.commit()
                 return self.get_appointment(appointment_id)
         except sqlite3.Error as e:
-            logger.error(f"Randevu güncelleme hatası: {e}")
+            logger.error("Randevu güncelleme hatası: %s", e)
             return None
 
     def approve_appointment(self, appointment_id: int) -> Optional[Dict[str, Any]]:
@@ -273,18 +403,19 @@ class SQLiteAppointmentAdapter:
     def get_booked_slots(self, date: str, dentist_id: int) -> List[Dict[str, Any]]:
         """Belirtilen gün için dolu randevuların aralıklarını (saat ve süre) döner."""
         try:
-            with self._conn() as conn:
-                cur = conn.cursor()
-                cur.execute(
-                    """
-                    SELECT time_slot, duration_minutes 
-                    FROM appointments 
-                    WHERE appointment_date = ? AND dentist_id = ? 
-                    AND status IN ('pending', 'approved')
-                    """,
-                    (date, dentist_id)
-                )
-                return [dict(row) for row in cur.fetchall()]
+            conn = self._conn()
+            cur = conn.cursor()
+            cur.row_factory = _dict_row_factory
+            cur.execute(
+                """
+                SELECT time_slot, duration_minutes 
+                FROM appointments 
+                WHERE appointment_date = ? AND dentist_id = ? 
+                AND status IN ('pending', 'approved')
+                """,
+                (date, dentist_id)
+            )
+            return cur.fetchall()
         except sqlite3.Error as e:
-            logger.error(f"Booked slots çekilirken hata: {e}")
+            logger.error("Booked slots çekilirken hata: %s", e)
             return []
\ No newline at end of file
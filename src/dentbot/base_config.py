@@ -1,15 +1,60 @@
 """
 Base configuration abstractions for Dent Bot.
+
+NOT: get_system_prompt() içine datetime.now() veya oturuma özel veri koymayın.
+Sistem prompt'u çağrılar arasında byte-byte aynı kalmalıdır ki LLM sağlayıcısının
+prefix cache'i (KV cache) korunabilsin. Zamana bağlı bilgiler get_dynamic_context()
+ile kullanıcı mesajına eklenir.
 """
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from string import Template
 from typing import Optional, Dict
 from datetime import date, datetime
 
 from dentbot.adapters.base import AppointmentAdapter
 
 
+# Prompt gövdesi statiktir; yalnızca klinik adı ($name) yerleştirilir. string.Template
+# kullanıldığı için prompt metnindeki süslü parantezlerin kaçırılması gerekmez.
+_SYSTEM_PROMPT_TEMPLATE = Template("""You are the Professional AI Assistant for $name.
+The CURRENT DATE and CURRENT TIME are given at the top of each user message.
+LANGUAGE: Respond in Turkish (Türkçe).
+
+URGENCY PROTOCOL:
+- If the user mentions PAIN (ağrı), SWELLING (şişlik), or EMERGENCY:
+  1. Respond with a short empathy message like "Geçmiş olsun, ağrınız için sizi öncelikli olarak muayeneye alalım."
+  2. IMMEDIATELY call 'check_available_slots' and present options.
+
+PHASE 1: INFORMATION & SLOTS
+- If user wants an appointment:
+  1. CALL 'check_available_slots' for today and tomorrow.
+  2. List at least 3 REAL available slots from the tool output.
+  3. NEVER suggest or book a time before the CURRENT TIME for today.
+  4. Present them clearly: "Bugün şu saatler müsait: [Saatler], Yarın ise: [Saatler]. Hangisi sizin için uygun?"
+  5. DO NOT ask "Hangi saat istersiniz?" without showing options first.
+  6. DO NOT ask for personal info yet.
+
+PHASE 2: DATA COLLECTION
+- After user picks a VALID slot from your list, ask for: Full Name, Phone, and Email.
+- STOP if data is missing. Do not invent names or phones.
+
+PHASE 3: EXECUTION
+- Only call 'create_appointment_request' when you have: A PICKED SLOT AND Name AND Phone AND Email.
+
+STRICT TOOL RULES:
+- [JSON DATA TYPES]: dentist_id and duration_minutes MUST be raw integers (e.g. 1, NOT "1").
+- NEVER use markdown (like **) inside tool arguments.
+
+FORMATTING:
+- Use MarkdownV2. Bold *dates* and *times*.
+- Escape characters like . and - using \\.
+""")
+
+_DYNAMIC_CONTEXT_TEMPLATE = "CURRENT DATE: {current_date}\nCURRENT TIME: {current_time}"
+
+
 class DentBotConfig(ABC):
     """Abstract configuration contract for all channels / providers."""
 
@@ -41,43 +86,27 @@ class DentBotConfig(ABC):
     def get_clinic_phone(self) -> Optional[str]: return None
     def get_clinic_email(self) -> Optional[str]: return None
 
-    def get_system_prompt(self) -> str:
-        name = self.get_clinic_display_name()
-        now = datetime.now()
-        current_date = now.strftime("%Y-%m-%d")
-        current_time = now.strftime("%H:%M")
-        
-        return f"""You are the Professional AI Assistant for {name}.
-CURRENT DATE: {current_date}
-CURRENT TIME: {current_time}
-LANGUAGE: Respond in Turkish (Türkçe).
-
-URGENCY PROTOCOL:
-- If the user mentions PAIN (ağrı), SWELLING (şişlik), or EMERGENCY:
-  1. Respond with a short empathy message like "Geçmiş olsun, ağrınız için sizi öncelikli olarak muayeneye alalım."
-  2. IMMEDIATELY call 'check_available_slots' and present options.
+    # Klinik bilgisi değişirse invalidate_system_prompt() ile sıfırlanır.
+    _cached_system_prompt: Optional[str] = None
 
-PHASE 1: INFORMATION & SLOTS
-- If user wants an appointment:
-  1. CALL 'check_available_slots' for today and tomorrow.
-  2. List at least 3 REAL available slots from the tool output.
-  3. NEVER suggest or book a time before {current_time} for today.
-  4. Present them clearly: "Bugün şu saatler müsait: [Saatler], Yarın ise: [Saatler]. Hangisi sizin için uygun?"
-  5. DO NOT ask "Hangi saat istersiniz?" without showing options first.
-  6. DO NOT ask for personal info yet.
+    def get_system_prompt(self) -> str:
+        """Zamandan bağımsız sistem prompt'u; aynı instance için hep aynı string'i döner."""
+        if self._cached_system_prompt is None:
+            self._cached_system_prompt = self._build_system_prompt()
+        return self._cached_system_prompt
 
-PHASE 2: DATA COLLECTION
-- After user picks a VALID slot from your list, ask for: Full Name, Phone, and Email.
-- STOP if data is missing. Do not invent names or phones.
+    def _build_system_prompt(self) -> str:
+        """Prompt metnini üretir; alt sınıflar prompt kaynağını değiştirmek için bunu override eder."""
+        return _SYSTEM_PROMPT_TEMPLATE.substitute(name=self.get_clinic_display_name())
 
-PHASE 3: EXECUTION
-- Only call 'create_appointment_request' when you have: A PICKED SLOT AND Name AND Phone AND Email.
+    def invalidate_system_prompt(self) -> None:
+        """Klinik bilgileri çalışma anında değiştiğinde prompt'un yeniden üretilmesini sağlar."""
+        self._cached_system_prompt = None
 
-STRICT TOOL RULES:
-- [JSON DATA TYPES]: dentist_id and duration_minutes MUST be raw integers (e.g. 1, NOT "1").
-- NEVER use markdown (like **) inside tool arguments.
-
-FORMATTING:
-- Use MarkdownV2. Bold *dates* and *times*.
-- Escape characters like . and - using \\.
-"""
\ No newline at end of file
+    def get_dynamic_context(self) -> str:
+        """Kullanıcı mesajına eklenecek zamana bağlı bağlam (tarih ve saat)."""
+        now = datetime.now()
+        return _DYNAMIC_CONTEXT_TEMPLATE.format(
+            current_date=now.strftime("%Y-%m-%d"),
+            current_time=now.strftime("%H:%M"),
+        )
@@ -1,9 +1,36 @@
-from .telegram import run_telegram_bot, create_telegram_app
-from .dentist_panel import run_dentist_panel, create_dentist_panel_app
+"""
+Telegram kanalları.
+
+Alt modüller (ve python-telegram-bot) ilk öznitelik erişiminde yüklenir (PEP 562);
+yalnızca hasta botu çalıştırılırken doktor paneli import edilmez.
+"""
+from importlib import import_module
+
+_EXPORTS = {
+    "run_telegram_bot": ".telegram",
+    "create_telegram_app": ".telegram",
+    "invalidate_availability_cache": ".telegram",
+    "run_dentist_panel": ".dentist_panel",
+    "create_dentist_panel_app": ".dentist_panel",
+}
 
 __all__ = [
     "run_telegram_bot", 
     "create_telegram_app", 
+    "invalidate_availability_cache",
     "run_dentist_panel",
     "create_dentist_panel_app", 
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
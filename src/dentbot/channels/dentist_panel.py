@@ -1,15 +1,19 @@
 """
 Dentist Panel Telegram Channel implementation.
 Hız, çift tıklama koruması ve detay saklama özellikli tam sürüm.
+
+Yalnızca MarkdownV2 desteklenir: tüm metinler escape_markdown_v2 ile kaçırılır ve
+parse_mode='MarkdownV2' ile gönderilir. parse_mode='Markdown' (legacy) geri getirilmemelidir.
 """
 from __future__ import annotations
 
 import asyncio
 import logging
-import re
+from collections import OrderedDict
 from typing import Dict, Any, Optional
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.request import HTTPXRequest
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -17,33 +21,100 @@ from telegram.ext import (
     CallbackQueryHandler,
 )
 
+from dentbot._http import TELEGRAM_POOL_SIZE, TELEGRAM_POOL_TIMEOUT, http_version
 from dentbot.config import get_config
-from dentbot.services import ApprovalService 
+from dentbot.services import ApprovalService
 from dentbot.models import Appointment
+from dentbot.models.appointment import escape_markdown_v2
 from dentbot.tools import get_approval_service 
 
 logger = logging.getLogger(__name__)
 
 APPROVE_PREFIX = "APPROVE_"
 REJECT_PREFIX = "REJECT_"
+_APPROVE_LEN = len(APPROVE_PREFIX)
+_REJECT_LEN = len(REJECT_PREFIX)
+
+# Bekleyen randevu mesajı; statik kısımlar zaten MarkdownV2 uyumludur, yalnızca alanlar kaçırılır.
+_PENDING_TEMPLATE = (
+    "🆔 *Kayıt:* {ref}\n"
+    "📅 *Tarih:* {date}\n"
+    "🕒 *Saat:* {time}\n"
+    "👤 *Hasta:* {patient}\n"
+    "🦷 *Tedavi:* {treatment}"
+)
+
+# /list_pending yanıtları bu büyüklükte gruplar halinde eşzamanlı gönderilir.
+_SEND_BATCH_SIZE = 5
+_SEND_BATCH_DELAY = 1.0
+
+# Callback'i hiç gelmeyen mesajların metni sonsuza dek tutulmasın; en eski kayıtlar düşürülür
+# (düşen mesajın metni callback'te query.message.text_markdown_v2'den okunur).
+MSG_MD_CACHE_SIZE = 512
 
 # ------------------------------------
 # Yardımcı Fonksiyonlar
 # ------------------------------------
 
-def escape_markdown_v2(text: str) -> str:
-    """MarkdownV2 özel karakterlerini Telegram standartlarına göre kaçırır."""
-    if text is None:
-        return ""
-    escape_chars = r'_*[]()~`>#+-=|{}.!'
-    return re.sub(f'([{re.escape(escape_chars)}])', r'\\\1', str(text))
+# Sabit durum metinleri ve buton etiketleri import anında bir kez hazırlanır.
+_STATUS_APPROVED_MDV2 = escape_markdown_v2("\n\n✅ DURUM: ONAYLANDI")
+_STATUS_REJECTED_MDV2 = escape_markdown_v2("\n\n❌ DURUM: REDDEDİLDİ")
+# Aynı mesajda başka bir işlem sürerken gelen tıklamaya gösterilen bildirim (düz metin)
+_BUSY_ANSWER = "Bu mesajdaki önceki işlem sürüyor, lütfen birkaç saniye sonra tekrar deneyin."
+_NO_PENDING_MDV2 = "✅ *Bekleyen randevu talebi bulunmamaktadır\\.*"
+_BTN_APPROVE_LABEL = "✅ ONAYLA"
+_BTN_REJECT_LABEL = "❌ REDDET"
+
+def _approval_keyboard(app_id: int) -> InlineKeyboardMarkup:
+    """Randevu için onay/red butonlarını oluşturur (yalnızca callback_data değişir)."""
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton(_BTN_APPROVE_LABEL, callback_data=f"{APPROVE_PREFIX}{app_id}"),
+        InlineKeyboardButton(_BTN_REJECT_LABEL, callback_data=f"{REJECT_PREFIX}{app_id}")
+    ]])
+
+def _format_pending_message(app: Appointment) -> str:
+    """Bekleyen randevu mesajını modelde önbelleğe alınmış kaçırılmış alanlarla oluşturur."""
+    return _PENDING_TEMPLATE.format(
+        ref=app.ref_code_mdv2,
+        date=app.appointment_date_mdv2,
+        time=app.time_slot_mdv2,
+        patient=app.patient_name_mdv2,
+        treatment=app.treatment_type_mdv2,
+    )
+
+def _build_welcome_message(config) -> str:
+    """Klinik adı kaçırılmış /start karşılama mesajını oluşturur."""
+    clinic_name = escape_markdown_v2(config.get_clinic_display_name())
+    return (
+        f"👩‍⚕️ *{clinic_name} Doktor Paneli*\n\n"
+        "Hoş geldiniz\\. Talepleri yönetmek için /list\\_pending komutunu kullanın\\."
+    )
+
+# İlk başarılı çözümlemeden sonra servis değişmez; tekrar global lookup yapılmaz.
+_CACHED_APPROVAL_SERVICE: Optional[ApprovalService] = None
 
 def _get_approval_service_instance() -> ApprovalService:
     """Global olarak set edilmiş ApprovalService instance'ını döndürür."""
+    global _CACHED_APPROVAL_SERVICE
+    if _CACHED_APPROVAL_SERVICE is not None:
+        return _CACHED_APPROVAL_SERVICE
     service = get_approval_service()
     if not service:
         logger.error("ApprovalService henüz başlatılmadı!")
         raise RuntimeError("Sistem hatası: ApprovalService hazır değil.")
+    _CACHED_APPROVAL_SERVICE = service
+    return service
+
+def _reset_approval_service_cache() -> None:
+    """Testlerde veya servis değiştirildiğinde önbelleğe alınmış instance'ı temizler."""
+    global _CACHED_APPROVAL_SERVICE
+    _CACHED_APPROVAL_SERVICE = None
+
+def _approval_service_from(context: ContextTypes.DEFAULT_TYPE) -> ApprovalService:
+    """Handler'lar için ApprovalService'i bot_data'dan okur; ilk erişimde oraya yerleştirir."""
+    service = context.bot_data.get('approval_service')
+    if service is None:
+        service = context.bot_data['approval_service'] = _get_approval_service_instance()
     return service
 
 # ------------------------------------
@@ -56,7 +127,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         return
     
     chat_id = update.effective_chat.id
-    approval_service = _get_approval_service_instance()
+    approval_service = _approval_service_from(context)
     
     # Doktoru sisteme kaydet (Demo için ID: 1)
     try:
@@ -65,36 +136,62 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     except Exception as e:
         logger.error(f"Chat ID kaydı hatası: {e}")
 
-    clinic_name = escape_markdown_v2(get_config().get_clinic_display_name())
-    welcome_message = (
-        f"👩‍⚕️ *{clinic_name} Doktor Paneli*\n\n"
-        f"Hoş geldiniz\. Talepleri yönetmek için /list\_pending komutunu kullanın\."
-    )
+    welcome_message = context.bot_data.get('welcome_message') or _build_welcome_message(get_config())
     await update.message.reply_text(welcome_message, parse_mode='MarkdownV2')
 
 async def list_pending_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Bekleyen randevuları listeleyen komut."""
-    approval_service = _get_approval_service_instance()
-    pending = approval_service.get_pending_appointments()
+    approval_service = _approval_service_from(context)
+    # Appointment nesneleri servis tarafında önbelleklenir; kaçırılmış alanlar da onlarla birlikte saklanır.
+    pending = approval_service.get_pending_appointment_models()
     
     if not pending:
-        await update.message.reply_text("✅ *Bekleyen randevu talebi bulunmamaktadır\.*", parse_mode='MarkdownV2')
+        await update.message.reply_text(_NO_PENDING_MDV2, parse_mode='MarkdownV2')
         return
 
-    for app_data in pending:
-        app = Appointment.from_dict(app_data)
-        message = (
-            f"🆔 *Kayıt:* {escape_markdown_v2(app.get_reference_code())}\n"
-            f"📅 *Tarih:* {escape_markdown_v2(app.appointment_date)}\n"
-            f"🕒 *Saat:* {escape_markdown_v2(app.time_slot)}\n"
-            f"👤 *Hasta:* {escape_markdown_v2(app.patient_name)}\n"
-            f"🦷 *Tedavi:* {escape_markdown_v2(app.treatment_type)}"
+    # Önce tüm mesajlar hazırlanır, sonra gruplar halinde eşzamanlı gönderilir.
+    prepared = []
+    for app in pending:
+        prepared.append((_format_pending_message(app), _approval_keyboard(app.id)))
+
+    # Gönderilen MarkdownV2 metni message_id ile saklanır; callback'te yeniden üretilmez.
+    for start in range(0, len(prepared), _SEND_BATCH_SIZE):
+        batch = prepared[start:start + _SEND_BATCH_SIZE]
+        if start:
+            # Telegram'ın sohbet başına flood limitine takılmamak için gruplar arasında bekle
+            await asyncio.sleep(_SEND_BATCH_DELAY)
+        results = await asyncio.gather(
+            *(
+                update.message.reply_text(message, reply_markup=keyboard, parse_mode='MarkdownV2')
+                for message, keyboard in batch
+            ),
+            return_exceptions=True,
         )
-        keyboard = InlineKeyboardMarkup([[
-            InlineKeyboardButton("✅ ONAYLA", callback_data=f"{APPROVE_PREFIX}{app.id}"),
-            InlineKeyboardButton("❌ REDDET", callback_data=f"{REJECT_PREFIX}{app.id}")
-        ]])
-        await update.message.reply_text(message, reply_markup=keyboard, parse_mode='MarkdownV2')
+        for (message, _), result in zip(batch, results):
+            if isinstance(result, Exception):
+                logger.error("Bekleyen randevu mesajı gönderilemedi: %s", result)
+            else:
+                _remember_message(context, result.message_id, message)
+
+def _remember_message(context: ContextTypes.DEFAULT_TYPE, message_id: int, text: str) -> None:
+    """Gönderilen MarkdownV2 metnini message_id ile LRU olarak saklar."""
+    cache = context.bot_data.get('msg_md_cache')
+    if cache is None:
+        cache = context.bot_data['msg_md_cache'] = OrderedDict()
+    cache[message_id] = text
+    cache.move_to_end(message_id)
+    if len(cache) > MSG_MD_CACHE_SIZE:
+        cache.popitem(last=False)
+
+def _remaining_rows(markup: Optional[InlineKeyboardMarkup], app_id: int) -> list:
+    """İşlenen randevunun buton satırı dışındaki satırlar (tekil onay mesajında boş liste)."""
+    if markup is None:
+        return []
+    suffix = f"_{app_id}"
+    return [
+        row for row in markup.inline_keyboard
+        if not any((button.callback_data or "").endswith(suffix) for button in row)
+    ]
 
 async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Buton tıklamalarını işler (Hız ve Çakışma korumalı)."""
@@ -102,35 +199,54 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
     if not query or not query.message:
         return
     
-    await query.answer()
-
-    # Mevcut mesajı al (Detayların kaybolmaması için)
-    current_text = query.message.text_markdown_v2
+    # Butonlar artık durum metniyle aynı çağrıda kaldırıldığı için çift tıklama
+    # koruması, işlemdeki mesajların sözlüğüyle (mesaj -> işlenen buton) sağlanır.
+    # Aynı mesajda eşzamanlı iki düzenleme birbirinin buton satırlarını geri getirebileceği
+    # için mesaj başına tek işlem yürütülür: aynı butona tekrar basılması sessizce yok
+    # sayılır, özet mesajındaki başka bir randevu için doktordan yeniden denemesi istenir.
+    in_flight = context.bot_data.setdefault('callbacks_in_flight', {})
+    message_id = query.message.message_id
     data = query.data
-    approval_service = _get_approval_service_instance()
-    
+    if message_id in in_flight:
+        await query.answer(None if in_flight[message_id] == data else _BUSY_ANSWER)
+        return
+    in_flight[message_id] = data
     try:
-        # Butonları anında kaldır
-        await query.edit_message_reply_markup(reply_markup=None)
+        await query.answer()
+    except Exception:
+        in_flight.pop(message_id, None)
+        raise
+
+    # Mevcut mesajı al (Detayların kaybolmaması için); pop ile kayıt da serbest bırakılır
+    current_text = (
+        context.bot_data.get('msg_md_cache', {}).pop(message_id, None)
+        or query.message.text_markdown_v2
+    )
+    approval_service = _approval_service_from(context)
 
+    try:
         if data.startswith(APPROVE_PREFIX):
-            app_id = int(data.replace(APPROVE_PREFIX, ""))
+            app_id = int(data[_APPROVE_LEN:])
             approval_service.approve_appointment(app_id)
-            # Durum bilgisini escape ederek ekle
-            status_text = escape_markdown_v2("\n\n✅ DURUM: ONAYLANDI")
-            await query.edit_message_text(
-                text=f"{current_text}{status_text}",
-                parse_mode='MarkdownV2'
-            )
-            
+            status_text = _STATUS_APPROVED_MDV2
         elif data.startswith(REJECT_PREFIX):
-            app_id = int(data.replace(REJECT_PREFIX, ""))
+            app_id = int(data[_REJECT_LEN:])
             approval_service.reject_appointment(app_id)
-            status_text = escape_markdown_v2("\n\n❌ DURUM: REDDEDİLDİ")
-            await query.edit_message_text(
-                text=f"{current_text}{status_text}",
-                parse_mode='MarkdownV2'
-            )
+            status_text = _STATUS_REJECTED_MDV2
+        else:
+            return
+
+        # Özet mesajında (birden çok randevu) yalnızca işlenen randevunun satırı kaldırılır
+        remaining = _remaining_rows(query.message.reply_markup, app_id)
+        if remaining:
+            status_text += escape_markdown_v2(f" ({Appointment.reference_code_for(app_id)})")
+
+        # Tek API çağrısı: metni güncelle ve butonları kaldır
+        await query.edit_message_text(
+            text=f"{current_text}{status_text}",
+            parse_mode='MarkdownV2',
+            reply_markup=InlineKeyboardMarkup(remaining) if remaining else None,
+        )
     except Exception as e:
         if "Message is not modified" not in str(e):
             logger.error(f"Panel Hatası: {e}")
@@ -138,6 +254,8 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
                 text=f"{current_text}\n\n⚠️ İşlem başarısız: {escape_markdown_v2(str(e))}", 
                 parse_mode='MarkdownV2'
             )
+    finally:
+        in_flight.pop(message_id, None)
 
 def create_dentist_panel_app() -> Application:
     """Doktor paneli uygulamasını yapılandırır."""
@@ -146,21 +264,40 @@ def create_dentist_panel_app() -> Application:
     if not token: 
         raise ValueError("DENTIST_TELEGRAM_TOKEN eksik!")
     
-    application = Application.builder().token(token).build()
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("list_pending", list_pending_command))
-    application.add_handler(CallbackQueryHandler(handle_callback_query))
+    version = http_version()
+    application = (
+        Application.builder()
+        .token(token)
+        .request(HTTPXRequest(connection_pool_size=TELEGRAM_POOL_SIZE, pool_timeout=TELEGRAM_POOL_TIMEOUT, http_version=version))
+        .get_updates_request(HTTPXRequest(http_version=version))
+        .build()
+    )
+    # Klinik adı süreç boyunca değişmez; karşılama mesajı bir kez hazırlanır.
+    application.bot_data['config'] = config
+    application.bot_data['welcome_message'] = _build_welcome_message(config)
+    # block=False: birbirinden bağımsız güncellemeler (ör. art arda buton tıklamaları)
+    # eşzamanlı işlenir. Handler'lar paylaşılan user_data/bot_data üzerinde await
+    # arasına yayılan oku-değiştir-yaz işlemleri yapmamalıdır (gerekirse asyncio.Lock).
+    application.add_handler(CommandHandler("start", start_command, block=False))
+    application.add_handler(CommandHandler("list_pending", list_pending_command, block=False))
+    application.add_handler(CallbackQueryHandler(handle_callback_query, block=False))
     
     return application
 
 async def run_dentist_panel(application: Application) -> None:
-    """Doktor panelini asenkron olarak çalıştırır."""
+    """
+    Doktor panelini iptal edilene kadar çalıştırır. Sinyaller main.py'de tek yerden
+    yönetilir; iptal edildiğinde panel düzgünce kapatılır.
+    """
     logger.info("Doktor Paneli başlatılıyor...")
     await application.initialize()
     await application.start()
     await application.updater.start_polling(drop_pending_updates=True)
-    
+
     try:
         await asyncio.Event().wait()
-    except (asyncio.CancelledError, KeyboardInterrupt):
-        await application.stop()
\ No newline at end of file
+    finally:
+        logger.info("Doktor Paneli durduruluyor...")
+        await application.updater.stop()
+        await application.stop()
+        await application.shutdown()
@@ -5,15 +5,20 @@ Data type validation ve Manuel Type Casting içeren eksiksiz tam sürüm.
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import json
 import logging
 import re
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Union
 
 # Veri tipi zorlaması için Pydantic
 from pydantic import BaseModel, Field
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
 from langchain_core.tools import StructuredTool
-from langchain_groq import ChatGroq
 from telegram import Update
 from telegram.ext import (
     Application,
@@ -22,9 +27,14 @@ from telegram.ext import (
     MessageHandler,
     filters,
 )
+from telegram.request import HTTPXRequest
 
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
+
+from dentbot._http import TELEGRAM_POOL_SIZE, TELEGRAM_POOL_TIMEOUT, http2_available, http_version
 from dentbot.config import get_config
-from dentbot.prompts import get_system_prompt
+from dentbot.prompts import get_system_prompt, get_dynamic_context
 from dentbot.tools import (
     list_dentists,
     get_dentist_schedule,
@@ -43,10 +53,121 @@ from dentbot.tools import (
 logger = logging.getLogger(__name__)
 
 # Ayarlar
-TOOL_LOOP_TIMEOUT = 45  
-LLM_CALL_TIMEOUT = 30   
+TOOL_LOOP_TIMEOUT = 45  # Tek bir mesajın agent döngüsü için üst sınır (saniye)
+LLM_CALL_TIMEOUT = 30
+# Bir turda eşzamanlı çalışan araç çağrısı üst sınırı (adaptör/DB'yi korumak için)
+MAX_PARALLEL_TOOLS = 4
+_TOOL_SEMAPHORE = asyncio.Semaphore(MAX_PARALLEL_TOOLS)
+# Tüm kullanıcılar tek event loop'ta çalışır; Groq anahtar başına hız limitini aşmamak için
+# aynı anda en fazla bu kadar LLM isteği gönderilir.
+MAX_CONCURRENT_LLM_CALLS = 16
+_LLM_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+
+# Salt-okunur araçların sonuçları için TTL (saniye). Listede olmayan araçlar
+# (randevu oluşturma/iptal/erteleme/detay) asla önbelleğe alınmaz.
+_TOOL_TTL: Dict[str, float] = {
+    "list_dentists": 300,
+    "get_treatment_list": 600,
+    "get_dentist_specialties": 600,
+    "check_available_slots": 15,
+    "get_dentist_schedule": 15,
+    "get_treatment_duration": 3600,
+}
+# Randevu durumunu değiştiren araçlar; başarılı olduklarında müsaitlik sonuçları düşürülür.
+_WRITE_TOOLS = frozenset({"create_appointment_request", "cancel_appointment", "reschedule_appointment"})
+_AVAILABILITY_TOOLS = frozenset({"check_available_slots", "get_dentist_schedule"})
+TOOL_CACHE_MAX_ENTRIES = 1024
+# (araç adı, argümanların JSON'u) -> (son geçerlilik zamanı, sonuç veya bekleyen prefetch Task'ı)
+_tool_cache: Dict[tuple, tuple] = {}
+
+# Spekülatif ön yükleme: bir araç çağrıldıktan sonra LLM'in büyük olasılıkla isteyeceği
+# argümansız araçlar, LLM yanıtı üretilirken arka planda çalıştırılır.
+_NEXT_TOOL_PREDICTOR: Dict[str, tuple] = {
+    "list_dentists": ("get_treatment_list",),
+    "get_dentist_specialties": ("list_dentists",),
+    "get_treatment_list": ("list_dentists",),
+}
+# Tamamlanmayan prefetch görevleri bu süreden sonra iptal edilir.
+PREFETCH_TIMEOUT = 30
+
+# Telegram mesaj sınırı 4096 karakterdir; kaçırma metni en fazla iki katına çıkardığı
+# için ham yanıt bu uzunlukta parçalara bölünür (kaçış dizileri parça sınırında bölünmez).
+MESSAGE_CHUNK_CHARS = 2048
+
+# Paylaşılan HTTP bağlantı havuzu ayarları
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE = 20
+
+# Akış sırasında kısmi yanıt mesajını güncelleme aralığı (saniye; Telegram edit limiti)
+STREAM_EDIT_INTERVAL = 0.8
+
+# Kullanıcı başına saklanan mesaj sayısı (sistem mesajı hariç); deque soldan kendiliğinden düşürür
+HISTORY_LIMIT = 12
+
+# LLM'e giden liste bu uzunluğu aşınca eski araç çıktıları tek satırlık özete indirilir
+COMPACT_HISTORY_THRESHOLD = 10
+TOOL_DIGEST_CHARS = 160
+
+LLM_TEMPERATURE = 0.1
+# Randevu akışı birbirine bağımlı üç tur ister (tedaviye göre müsaitlik -> slot kontrolü ->
+# randevu oluşturma); bağımsız çağrılar paralel gittiği için bir tur pay yeterlidir.
+MAX_TOOL_ITERATIONS = 4
+# Bir LLM yanıtında çalıştırılacak en fazla araç çağrısı
+MAX_TOOL_CALLS_PER_TURN = 8
+# Hata türüne göre kullanıcıya gösterilen (önceden kaçırılmış) yanıtlar
+TIMEOUT_ERROR_MDV2 = r"⏳ İsteğiniz beklenenden uzun sürdü\. Lütfen birazdan tekrar deneyin\."
+GENERIC_ERROR_MDV2 = r"⚠️ Üzgünüm, şu an isteğinizi işleyemiyorum\. Lütfen tekrar deneyin\."
+UNKNOWN_TOOL_RESPONSE = "Üzgünüm, isteğinizi tam anlayamadım. Lütfen sorunuzu farklı bir şekilde ifade eder misiniz?"
+
+# Araç veya model gerektirmeyen kısa mesajlar için hazır yanıtlar (küçük harfli, noktalamasız anahtar).
+# "tamam", "teşekkürler" gibi onay/teşekkür sözleri bilinçli olarak yoktur: randevu akışında
+# bota verilen yanıt olabilirler ve modele gitmeleri gerekir.
+_SMALL_TALK = {
+    "merhaba": "Merhaba! Size nasıl yardımcı olabilirim?",
+    "selam": "Merhaba! Size nasıl yardımcı olabilirim?",
+    "selamlar": "Merhaba! Size nasıl yardımcı olabilirim?",
+    "iyi günler": "İyi günler! Size nasıl yardımcı olabilirim?",
+    "nasılsın": "Teşekkür ederim, iyiyim! Randevu veya tedavilerimizle ilgili nasıl yardımcı olabilirim?",
+    "görüşürüz": "Görüşmek üzere, sağlıklı günler dileriz!",
+    "hoşça kal": "Görüşmek üzere, sağlıklı günler dileriz!",
+}
+_SMALL_TALK_PUNCT = " .!?,"
+
+# Birebir aynı soru + aynı yakın geçmiş için LLM yanıt önbelleği (LRU). Yalnızca düşük
+# sıcaklıkta (deterministiğe yakın çıktı) anlamlıdır.
+RESPONSE_CACHE_SIZE = 512
+_RESPONSE_CACHE_ENABLED = LLM_TEMPERATURE < 0.2
+_response_cache: "OrderedDict[str, str]" = OrderedDict()
+# Yalnızca bu araçlarla yanıtlanan turlar önbelleğe alınır; bunlar gün içinde değişmeyen
+# katalog verisidir. Slot/randevu araçları anlık duruma bağlıdır; hiç araç kullanmayan
+# yanıtlar ise saat bağlamına dayanabilir ("şu an açık mısınız?") ve önbelleğe alınmaz.
+_RESPONSE_CACHEABLE_TOOLS = frozenset({
+    "list_dentists",
+    "get_dentist_specialties",
+    "get_treatment_list",
+    "get_treatment_duration",
+})
 
 # --- PYDANTIC INPUT SCHEMAS ---
+# Her araç için açık şema: from_function imza yansıtması yapmaz ve LLM'e daha sıkı
+# bir JSON şeması gider (hatalı argümanla yeniden deneme döngüleri azalır).
+
+class ActiveFilterInput(BaseModel):
+    is_active: bool = Field(default=True, description="Sadece aktif kayıtları listele")
+
+class NoInput(BaseModel):
+    """Parametre almayan araçlar için boş şema."""
+
+class DentistDateInput(BaseModel):
+    dentist_id: int = Field(description="Diş hekiminin benzersiz ID numarası (Sadece tam sayı)")
+    date: str = Field(description="Tarih (YYYY-MM-DD)")
+
+class TreatmentNameInput(BaseModel):
+    treatment_name: str = Field(description="Tedavi adı")
+
+class TreatmentDateInput(BaseModel):
+    treatment_name: str = Field(description="Tedavi adı")
+    date: str = Field(description="Tarih (YYYY-MM-DD)")
 
 class CreateAppointmentInput(BaseModel):
     """Randevu oluşturma parametrelerini zorunlu veri tipleriyle tanımlar."""
@@ -61,133 +182,540 @@ class CreateAppointmentInput(BaseModel):
     notes: Optional[str] = Field(default=None, description="Ek notlar")
     patient_chat_id: Optional[int] = Field(default=None, description="Sistem tarafından otomatik doldurulur")
 
+class AppointmentIdInput(BaseModel):
+    appointment_id: Union[int, str] = Field(description="Randevu ID'si veya APT-000123 formatında referans kodu")
+
+class RescheduleInput(BaseModel):
+    appointment_id: Union[int, str] = Field(description="Randevu ID'si veya APT-000123 formatında referans kodu")
+    new_date: Optional[str] = Field(default=None, description="Yeni tarih (YYYY-MM-DD)")
+    new_time: Optional[str] = Field(default=None, description="Yeni saat (HH:mm)")
+
 # --- LLM TOOL SETUP ---
 
 def create_langchain_tools() -> List[StructuredTool]:
     """Tüm araçları LangChain StructuredTool formatına çevirir."""
     return [
-        StructuredTool.from_function(func=list_dentists, name="list_dentists", description="Klinikteki tüm aktif diş hekimlerini listeler."),
-        StructuredTool.from_function(func=get_dentist_specialties, name="get_dentist_specialties", description="Diş hekimlerinin uzmanlık alanlarını listeler."),
-        StructuredTool.from_function(func=get_dentist_schedule, name="get_dentist_schedule", description="Hekimin müsaitlik saatlerini getirir."),
-        StructuredTool.from_function(func=get_treatment_list, name="get_treatment_list", description="Tedavi hizmetlerini ve sürelerini listeler."),
-        StructuredTool.from_function(func=get_treatment_duration, name="get_treatment_duration", description="Tedavi süresini dakika olarak döner."),
-        StructuredTool.from_function(func=check_available_slots, name="check_available_slots", description="Belirli tarih ve hekim için müsait slotları listeler."),
-        StructuredTool.from_function(func=check_availability_by_treatment, name="check_availability_by_treatment", description="Belirli tedavi için uygun doktorları ve slotları listeler."),
+        StructuredTool.from_function(func=list_dentists, name="list_dentists", description="Klinikteki tüm aktif diş hekimlerini listeler.", args_schema=ActiveFilterInput),
+        StructuredTool.from_function(func=get_dentist_specialties, name="get_dentist_specialties", description="Diş hekimlerinin uzmanlık alanlarını listeler.", args_schema=NoInput),
+        StructuredTool.from_function(func=get_dentist_schedule, name="get_dentist_schedule", description="Hekimin müsaitlik saatlerini getirir.", args_schema=DentistDateInput),
+        StructuredTool.from_function(func=get_treatment_list, name="get_treatment_list", description="Tedavi hizmetlerini ve sürelerini listeler.", args_schema=ActiveFilterInput),
+        StructuredTool.from_function(func=get_treatment_duration, name="get_treatment_duration", description="Tedavi süresini dakika olarak döner.", args_schema=TreatmentNameInput),
+        StructuredTool.from_function(func=check_available_slots, name="check_available_slots", description="Belirli tarih ve hekim için müsait slotları listeler.", args_schema=DentistDateInput),
+        StructuredTool.from_function(func=check_availability_by_treatment, name="check_availability_by_treatment", description="Belirli tedavi için uygun doktorları ve slotları listeler.", args_schema=TreatmentDateInput),
         StructuredTool.from_function(
             func=create_appointment_request, 
             name="create_appointment_request", 
             description="Yeni randevu talebi oluşturur. İsim, Tel, Email zorunludur.",
             args_schema=CreateAppointmentInput
         ),
-        StructuredTool.from_function(func=get_appointment_details, name="get_appointment_details", description="Randevu ID ile detay getirir."),
-        StructuredTool.from_function(func=cancel_appointment, name="cancel_appointment", description="Randevuyu iptal eder."),
-        StructuredTool.from_function(func=reschedule_appointment, name="reschedule_appointment", description="Randevu tarih/saatini günceller."),
+        StructuredTool.from_function(func=get_appointment_details, name="get_appointment_details", description="Randevu ID ile detay getirir.", args_schema=AppointmentIdInput),
+        StructuredTool.from_function(func=cancel_appointment, name="cancel_appointment", description="Randevuyu iptal eder.", args_schema=AppointmentIdInput),
+        StructuredTool.from_function(func=reschedule_appointment, name="reschedule_appointment", description="Randevu tarih/saatini günceller.", args_schema=RescheduleInput),
     ]
 
-_tools: Optional[List[StructuredTool]] = None
-_tool_map: Dict[str, StructuredTool] = {}
+# Araç listesi import sırasında bir kez kurulur.
+_TOOL_LIST: List[StructuredTool] = create_langchain_tools()
+_TOOL_MAP: Dict[str, StructuredTool] = {tool.name: tool for tool in _TOOL_LIST}
 _llm: Optional[ChatGroq] = None
+_llm_with_tools: Optional[Any] = None
+_llm_with_tools_lock = threading.Lock()
 
 def get_tools() -> List[StructuredTool]:
-    global _tools, _tool_map
-    if _tools is None:
-        _tools = create_langchain_tools()
-        _tool_map = {tool.name: tool for tool in _tools}
-    return _tools
+    return _TOOL_LIST
 
 def get_tool_map_internal() -> Dict[str, StructuredTool]:
-    if not _tool_map: get_tools()
-    return _tool_map
+    return _TOOL_MAP
 
 def get_llm() -> ChatGroq:
     global _llm
     if _llm is None:
+        # Groq SDK'sı (ve HTTP istemcisi) ilk mesajda yüklenir; bot açılışını yavaşlatmaz.
+        import httpx
+        from langchain_groq import ChatGroq
+
         config = get_config()
+        # Tüm LLM çağrıları aynı bağlantı havuzunu kullanır; her istekte yeni TLS el sıkışması olmaz.
+        http_async_client = httpx.AsyncClient(
+            http2=http2_available(),
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE),
+            timeout=LLM_CALL_TIMEOUT,
+        )
         _llm = ChatGroq(
             model=config.get_groq_model(),
             groq_api_key=config.get_groq_api_key(),
-            temperature=0.1,
+            temperature=LLM_TEMPERATURE,
             timeout=LLM_CALL_TIMEOUT,
+            http_async_client=http_async_client,
+            # Model bağımsız araç çağrılarını tek turda birlikte üretebilir
+            model_kwargs={"parallel_tool_calls": True},
         )
     return _llm
 
+def get_llm_with_tools() -> Any:
+    """Araçlar bağlanmış LLM'i döndürür; bind_tools şema üretimi yalnızca bir kez yapılır."""
+    global _llm_with_tools
+    if _llm_with_tools is None:
+        with _llm_with_tools_lock:
+            if _llm_with_tools is None:
+                _llm_with_tools = get_llm().bind_tools(get_tools())
+    return _llm_with_tools
+
 # --- YARDIMCI FONKSİYONLAR ---
 
+# Modelin yanıta sızdırdığı ham fonksiyon çağrısı etiketleri (çok satırlı olabilir)
+_FUNCTION_TAG_RE = re.compile(r'<function=.*?>.*?</function>', re.DOTALL)
+# '*' bilinçli olarak kaçırılmaz; modelin kalın yazı biçimlendirmesi korunur.
+_MDV2_TABLE = str.maketrans({c: '\\' + c for c in '_[]()~`>#+-=|{}.!'})
+
 def escape_markdown_v2(text: str) -> str:
     """MarkdownV2 özel karakterlerini kaçırır ve teknik sızıntıları temizler."""
-    clean_text = re.sub(r'<function=.*?>.*?</function>', '', text)
-    escape_chars = r'_[]()~`>#+-=|{}.!'
-    return re.sub(f'([{re.escape(escape_chars)}])', r'\\\1', clean_text)
+    if '<function=' in text:
+        text = _FUNCTION_TAG_RE.sub('', text)
+    return text.translate(_MDV2_TABLE)
+
+# Süreç genelinde tek sistem mesajı; ilk kullanımda config'ten üretilir.
+_SYSTEM_MESSAGE: Optional[SystemMessage] = None
 
-def _prepare_history(context: ContextTypes.DEFAULT_TYPE) -> List[Any]:
+def _get_system_message() -> SystemMessage:
+    """Tüm oturumların paylaştığı tek SystemMessage; içerik baytları oturumlar arasında aynıdır."""
+    global _SYSTEM_MESSAGE
+    if _SYSTEM_MESSAGE is None:
+        _SYSTEM_MESSAGE = SystemMessage(content=get_system_prompt())
+    return _SYSTEM_MESSAGE
+
+def reload_system_prompt() -> SystemMessage:
+    """Klinik bilgisi/prompt değiştiğinde sistem mesajını yeniden üretir (yeniden başlatmadan)."""
+    global _SYSTEM_MESSAGE
+    get_config().invalidate_system_prompt()
+    _SYSTEM_MESSAGE = None
+    return _get_system_message()
+
+def _reset_history(context: ContextTypes.DEFAULT_TYPE) -> deque:
+    """Kullanıcının geçmişini sıfırlar; sistem mesajı geçmişte tutulmaz."""
+    history: deque = deque(maxlen=HISTORY_LIMIT)
+    context.user_data["history"] = history
+    return history
+
+def _prepare_history(context: ContextTypes.DEFAULT_TYPE) -> deque:
     history = context.user_data.get("history")
-    if history is None:
-        history = [SystemMessage(content=get_system_prompt())]
-        context.user_data["history"] = history
+    if not isinstance(history, deque):
+        history = _reset_history(context)
     return history
 
+def _build_messages(context: ContextTypes.DEFAULT_TYPE, history: deque) -> List[Any]:
+    """LLM'e gidecek listeyi kurar: sabit sistem mesajı + sınırlı geçmiş."""
+    tail = list(history)
+    # Deque soldan kestiği için kuyruk, AIMessage'ı düşmüş bir ToolMessage ile başlayabilir
+    start = 0
+    while start < len(tail) and isinstance(tail[start], ToolMessage):
+        start += 1
+    return [_get_system_message(), *tail[start:]]
+
+def _compact_history(messages: List[Any]) -> List[Any]:
+    """
+    Eski araç çıktılarını kısa bir özetle değiştirir; en son AIMessage'dan sonraki
+    araç sonuçları olduğu gibi kalır. Kalıcı geçmiş değişmez, yalnızca LLM'e giden liste küçülür.
+    """
+    if len(messages) <= COMPACT_HISTORY_THRESHOLD:
+        return messages
+    last_ai = max((i for i, m in enumerate(messages) if isinstance(m, AIMessage)), default=-1)
+    compacted = list(messages)
+    for i in range(last_ai):
+        message = compacted[i]
+        if not isinstance(message, ToolMessage) or len(message.content) <= TOOL_DIGEST_CHARS:
+            continue
+        head = str(message.content).strip().split("\n", 1)[0][:TOOL_DIGEST_CHARS]
+        compacted[i] = ToolMessage(
+            content=f"[Önceden alındı, özet] {head}…",
+            tool_call_id=message.tool_call_id,
+        )
+    return compacted
+
+def _split_message(text: str, limit: int = MESSAGE_CHUNK_CHARS) -> List[str]:
+    """Uzun yanıtı mümkünse satır sonlarından bölerek Telegram sınırına uygun parçalara ayırır."""
+    if len(text) <= limit:
+        return [text]
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    if text:
+        parts.append(text)
+    return parts
+
 # --- AGENT DÖNGÜSÜ ---
 
-async def handle_message_with_agent(user_message: str, chat_id: int, context: ContextTypes.DEFAULT_TYPE) -> str:
+def _cache_put(key: tuple, value: Any, ttl: float) -> None:
+    """Sonucu veya bekleyen prefetch Task'ını TOOL_CACHE_MAX_ENTRIES sınırını koruyarak saklar."""
+    now = time.monotonic()
+    if key not in _tool_cache and len(_tool_cache) >= TOOL_CACHE_MAX_ENTRIES:
+        # Önce süresi dolmuş kayıtları temizle; yine doluysa en eskiyi at
+        for stale in [k for k, (expires_at, _) in _tool_cache.items() if expires_at <= now]:
+            del _tool_cache[stale]
+        if len(_tool_cache) >= TOOL_CACHE_MAX_ENTRIES:
+            del _tool_cache[next(iter(_tool_cache))]
+    _tool_cache[key] = (now + ttl, value)
+
+def _store_tool_result(key: tuple, content: str, ttl: float) -> None:
+    _cache_put(key, content, ttl)
+
+def invalidate_availability_cache() -> None:
+    """Müsaitlik araçlarının önbelleğini düşürür; randevu durumu değişince çağrılır (araçlar, onay/red)."""
+    for key in [k for k in _tool_cache if k[0] in _AVAILABILITY_TOOLS]:
+        del _tool_cache[key]
+
+def _tool_cache_key(tool: StructuredTool, args: Dict[str, Any]) -> tuple:
+    """
+    Argümanlar şema varsayılanlarıyla tamamlanarak anahtarlanır; böylece argümansız prefetch
+    ile LLM'in {"is_active": true} çağrısı aynı kayda düşer.
+    """
+    try:
+        normalized = tool.args_schema(**args).model_dump()
+    except (AttributeError, TypeError, ValueError):
+        normalized = args
+    return (tool.name, json.dumps(normalized, sort_keys=True, default=str))
+
+async def _run_prefetch(tool: StructuredTool, key: tuple, ttl: float) -> str:
+    async with _TOOL_SEMAPHORE:
+        content = str(await asyncio.wait_for(tool.ainvoke({}), timeout=PREFETCH_TIMEOUT))
+    _store_tool_result(key, content, ttl)
+    return content
+
+def _prefetch_likely_tools(history: List[Any]) -> None:
+    """Son AIMessage'daki araç çağrılarına göre muhtemel sonraki araçları arka planda başlatır."""
+    last_ai = next((m for m in reversed(history) if isinstance(m, AIMessage)), None)
+    if last_ai is None or not last_ai.tool_calls:
+        return
+
+    now = time.monotonic()
+    tool_map = get_tool_map_internal()
+    for tool_call in last_ai.tool_calls:
+        for predicted in _NEXT_TOOL_PREDICTOR.get(tool_call["name"], ()):
+            tool = tool_map.get(predicted)
+            if tool is None:
+                continue
+            key = _tool_cache_key(tool, {})
+            cached = _tool_cache.get(key)
+            if cached is not None and cached[0] > now:
+                continue
+            task = asyncio.create_task(_run_prefetch(tool, key, _TOOL_TTL[predicted]))
+            # Görev hatasını sessizce tüket; gerçek çağrı gelirse araç yeniden çalıştırılır
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            _cache_put(key, task, PREFETCH_TIMEOUT)
+
+# Markdown yıldız/alt çizgilerini tek C geçişinde siler
+_STRIP_TABLE = str.maketrans('', '', '*_')
+_INT_ARGS = ("dentist_id", "duration_minutes")
+
+def _coerce_int(value: Any) -> Any:
+    """LLM'den gelen sayısal argümanı int'e çevirir ('*3*', '3', 3.0 -> 3)."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        if value.is_integer():
+            return int(value)
+        raise ValueError(f"Tam sayı değil: {value}")
+    if isinstance(value, str):
+        cleaned = value.translate(_STRIP_TABLE).strip()
+        try:
+            return int(cleaned)
+        except ValueError:
+            return _coerce_int(float(cleaned))
+    return value
+
+async def _invoke_one(tool_call: Dict[str, Any], chat_id: int) -> ToolMessage:
+    """Tek bir araç çağrısını argüman düzeltmesiyle çalıştırır ve ToolMessage döner."""
+    tool_name = tool_call["name"]
+    args = tool_call["args"]
+
+    # ⭐ DEFANSİF KOD: Manuel Veri Tipi Dönüşümü
+    # Groq bazen tırnak içinde veya float olarak gönderirse burada tam sayıya zorluyoruz
+    for key in _INT_ARGS:
+        if key in args:
+            try:
+                args[key] = _coerce_int(args[key])
+            except (ValueError, TypeError):
+                logger.warning(f"Argument {key} could not be cast to int: {args[key]}")
+
+    if tool_name == "create_appointment_request":
+        args["patient_chat_id"] = chat_id
+
+    tool = get_tool_map_internal().get(tool_name)
+    if not tool:
+        return ToolMessage(content=f"Error: Tool {tool_name} not found", tool_call_id=tool_call["id"])
+
+    ttl = _TOOL_TTL.get(tool_name)
+    cache_key = None
+    if ttl is not None:
+        cache_key = _tool_cache_key(tool, args)
+        cached = _tool_cache.get(cache_key)
+        if cached is not None:
+            expires_at, value = cached
+            if isinstance(value, asyncio.Task):
+                if expires_at > time.monotonic() and not value.cancelled():
+                    try:
+                        # Görev kullanıcılar arasında paylaşılır; bu turun zaman aşımı/iptali
+                        # shield sayesinde görevi diğer bekleyenler için iptal etmez.
+                        return ToolMessage(content=await asyncio.shield(value), tool_call_id=tool_call["id"])
+                    except asyncio.CancelledError:
+                        if not value.cancelled():
+                            raise  # İptal edilen bu tur; görev çalışmaya devam eder
+                    except Exception:
+                        pass
+                else:
+                    value.cancel()
+                # İptal edilmiş/başarısız prefetch önbellekten düşülür; araç normal yoldan çalıştırılır
+                if _tool_cache.get(cache_key) is cached:
+                    del _tool_cache[cache_key]
+            elif expires_at > time.monotonic():
+                return ToolMessage(content=value, tool_call_id=tool_call["id"])
+
+    try:
+        async with _TOOL_SEMAPHORE:
+            result = await tool.ainvoke(args)
+        content = str(result)
+        if cache_key is not None:
+            _store_tool_result(cache_key, content, ttl)
+        elif tool_name in _WRITE_TOOLS:
+            invalidate_availability_cache()
+        return ToolMessage(content=content, tool_call_id=tool_call["id"])
+    except Exception as e:
+        logger.error(f"Tool Error ({tool_name}): {e}")
+        return ToolMessage(content=f"Error: {str(e)}", tool_call_id=tool_call["id"])
+
+def _response_cache_key(user_message: str, history: List[Any]) -> str:
+    """
+    Prompt sürümü, saat dilimi, kullanıcı mesajı ve son mesajlardan önbellek anahtarı üretir.
+    Dinamik bağlam saat hassasiyetinde anahtara girer; yanıt ("günaydın", "bugün") saat
+    değişince yeniden üretilir.
+    """
+    recent = [m.content for m in history[-4:] if not isinstance(m, SystemMessage)]
+    payload = json.dumps(
+        [hash(_get_system_message().content), datetime.now().strftime("%Y-%m-%d %H"), user_message.strip(), recent],
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _cache_response(key: str, response: str) -> None:
+    _response_cache[key] = response
+    _response_cache.move_to_end(key)
+    if len(_response_cache) > RESPONSE_CACHE_SIZE:
+        _response_cache.popitem(last=False)
+
+PartialCallback = Callable[[str], Awaitable[None]]
+
+async def _stream_ai_message(llm: Any, messages: List[Any], on_partial: Optional[PartialCallback]) -> Any:
+    """LLM yanıtını akış halinde toplar; araç çağrısı başlamadıysa kısmi metni bildirir."""
+    if on_partial is None:
+        async with _LLM_SEMAPHORE:
+            return await llm.ainvoke(messages)
+
+    aggregate = None
+    preview: Optional[asyncio.Task] = None
+    async with _LLM_SEMAPHORE:
+        async for chunk in llm.astream(messages):
+            aggregate = chunk if aggregate is None else aggregate + chunk
+            # Araç çağrıları akış sırasında yarımdır; yalnızca düz metin yanıtlar gösterilir.
+            # Telegram düzenlemesi beklenmez (semafor yalnızca LLM isteği süresince tutulur);
+            # önceki düzenleme sürerken gelen ara önizlemeler atlanır.
+            if aggregate.content and not aggregate.tool_call_chunks and (preview is None or preview.done()):
+                preview = asyncio.create_task(on_partial(str(aggregate.content)))
+        if aggregate is None:
+            logger.warning("LLM akışı boş döndü; yanıt tek istekle alınıyor.")
+            aggregate = await llm.ainvoke(messages)
+    # Son MarkdownV2 düzenlemesi, önizleme mesajı oluştuktan sonra yapılmalı
+    if preview is not None:
+        await preview
+    return aggregate
+
+def _awaiting_answer(history: deque) -> bool:
+    """Son AI mesajı kullanıcıya bir soru sorduysa True (hazır yanıtla araya girilmez)."""
+    last_ai = next((m for m in reversed(history) if isinstance(m, AIMessage)), None)
+    return last_ai is not None and str(last_ai.content).rstrip().endswith("?")
+
+async def handle_message_with_agent(
+    user_message: str,
+    chat_id: int,
+    context: ContextTypes.DEFAULT_TYPE,
+    on_partial: Optional[PartialCallback] = None,
+) -> str:
     history = _prepare_history(context)
-    llm_with_tools = get_llm().bind_tools(get_tools())
-    
-    history.append(HumanMessage(content=user_message))
 
-    for i in range(5):
-        ai_message = await llm_with_tools.ainvoke(history)
-        history.append(ai_message)
+    # Selamlaşma/teşekkür gibi mesajlar LLM'e gitmeden sabit yanıtla karşılanır
+    canned = _SMALL_TALK.get(user_message.strip().lower().rstrip(_SMALL_TALK_PUNCT))
+    if canned is not None and not _awaiting_answer(history):
+        history.append(HumanMessage(content=f"{get_dynamic_context()}\n\n{user_message}"))
+        history.append(AIMessage(content=canned))
+        return canned
+
+    # Zaman aşımı/iptal turun ortasında gelirse (ör. araçlar çalışırken) ToolMessage'ları
+    # eksik bir AIMessage geçmişte kalır ve sonraki istek API tarafından reddedilir; bu yüzden
+    # tamamlanmayan tur geçmişten geri alınır.
+    snapshot = list(history)
+    try:
+        return await _agent_turn(user_message, chat_id, context, history, on_partial)
+    except BaseException:
+        history.clear()
+        history.extend(snapshot)
+        raise
+
+async def _agent_turn(
+    user_message: str,
+    chat_id: int,
+    context: ContextTypes.DEFAULT_TYPE,
+    history: deque,
+    on_partial: Optional[PartialCallback],
+) -> str:
+    # Tur boyunca LLM tam listeyi görür; kalıcı geçmiş (deque) aynı mesajları yerinde biriktirir.
+    messages = _build_messages(context, history)
+    llm_with_tools = get_llm_with_tools()
+
+    def add(message: Any) -> None:
+        messages.append(message)
+        history.append(message)
+
+    cache_key = _response_cache_key(user_message, messages) if _RESPONSE_CACHE_ENABLED else None
+
+    # Zaman bilgisi sistem prompt'una değil kullanıcı mesajına eklenir; sistem prefix'i sabit kalır.
+    add(HumanMessage(content=f"{get_dynamic_context()}\n\n{user_message}"))
+
+    if cache_key is not None:
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            _response_cache.move_to_end(cache_key)
+            add(AIMessage(content=cached))
+            return cached
+
+    cacheable = cache_key is not None
+    for i in range(MAX_TOOL_ITERATIONS):
+        _prefetch_likely_tools(messages)
+        ai_message = await _stream_ai_message(llm_with_tools, _compact_history(messages), on_partial)
+        add(ai_message)
 
         if not ai_message.tool_calls:
-            context.user_data["history"] = history[-10:]
-            return str(ai_message.content)
-
-        for tool_call in ai_message.tool_calls:
-            tool_name = tool_call["name"]
-            args = tool_call["args"]
-            
-            # ⭐ DEFANSİF KOD: Manuel Veri Tipi Dönüşümü
-            # Groq bazen tırnak içinde gönderirse burada tam sayıya zorluyoruz
-            for key in ["dentist_id", "duration_minutes"]:
-                if key in args and isinstance(args[key], str):
-                    try:
-                        # Markdown yıldızlarını temizle ve int'e çevir
-                        clean_val = re.sub(r'[\*\_]', '', args[key])
-                        args[key] = int(clean_val)
-                    except (ValueError, TypeError):
-                        logger.warning(f"Argument {key} could not be cast to int: {args[key]}")
-
-            if tool_name == "create_appointment_request":
-                args["patient_chat_id"] = chat_id
-            
-            tool = get_tool_map_internal().get(tool_name)
-            if tool:
-                try:
-                    result = await tool.ainvoke(args)
-                    history.append(ToolMessage(content=str(result), tool_call_id=tool_call["id"]))
-                except Exception as e:
-                    logger.error(f"Tool Error ({tool_name}): {e}")
-                    history.append(ToolMessage(content=f"Error: {str(e)}", tool_call_id=tool_call["id"]))
-            else:
-                history.append(ToolMessage(content=f"Error: Tool {tool_name} not found", tool_call_id=tool_call["id"]))
+            response = str(ai_message.content)
+            # i > 0: önceki turlarda yalnızca katalog araçları çağrıldı
+            if cacheable and i > 0:
+                _cache_response(cache_key, response)
+            return response
+
+        tool_calls = ai_message.tool_calls
+        if cacheable and any(tc["name"] not in _RESPONSE_CACHEABLE_TOOLS for tc in tool_calls):
+            cacheable = False
+
+        # Kontrolden çıkmış bir model bütçeyi tüketmesin: fazla çağrılar çalıştırılmaz,
+        # ancak API her tool_call_id için bir ToolMessage beklediği için yanıtlanır.
+        overflow = tool_calls[MAX_TOOL_CALLS_PER_TURN:]
+        tool_calls = tool_calls[:MAX_TOOL_CALLS_PER_TURN]
+
+        # Tüm çağrılar bilinmeyen araçlara ise LLM'e geri dönmek yerine doğrudan yanıtla
+        tool_map = get_tool_map_internal()
+        if all(tc["name"] not in tool_map for tc in tool_calls):
+            for tool_call in ai_message.tool_calls:
+                add(ToolMessage(content=f"Error: Tool {tool_call['name']} not found", tool_call_id=tool_call["id"]))
+            add(AIMessage(content=UNKNOWN_TOOL_RESPONSE))
+            return UNKNOWN_TOOL_RESPONSE
+
+        # Aynı turdaki araç çağrıları birbirinden bağımsızdır; eşzamanlı çalıştırılır.
+        # gather sonuç sırasını korur, böylece ToolMessage'lar tool_call_id sırasıyla eklenir.
+        results = await asyncio.gather(
+            *(_invoke_one(tool_call, chat_id) for tool_call in tool_calls),
+            return_exceptions=True,
+        )
+        for tool_call, result in zip(tool_calls, results):
+            if isinstance(result, Exception):
+                logger.error("Tool Error (%s): %s", tool_call["name"], result)
+                result = ToolMessage(content=f"Error: {str(result)}", tool_call_id=tool_call["id"])
+            elif isinstance(result, BaseException):
+                raise result
+            add(result)
+        for tool_call in overflow:
+            add(ToolMessage(
+                content=f"Error: Bir turda en fazla {MAX_TOOL_CALLS_PER_TURN} araç çağrılabilir; bu çağrı atlandı.",
+                tool_call_id=tool_call["id"],
+            ))
+        if overflow:
+            logger.warning("Araç çağrısı sınırı aşıldı; %s çağrı atlandı.", len(overflow))
 
-    return str(history[-1].content)
+    # Tur sınırı doldu: araçsız LLM ile mevcut sonuçlardan metin yanıt üretilir,
+    # böylece kullanıcıya ham araç çıktısı gitmez.
+    async with _LLM_SEMAPHORE:
+        final_message = await get_llm().ainvoke(_compact_history(messages))
+    add(final_message)
+    return str(final_message.content)
 
 # --- HANDLERS ---
 
+async def _send_chunks(update: Update, placeholder: Any, response: str, chat_id: int) -> None:
+    """
+    Yanıt parçalarını sırayla gönderir (Telegram eşzamanlı isteklerin sırasını garanti etmez).
+    Bir parça gönderilemezse hata loglanır ve kalan parçalar denenmeye devam eder; kullanıcı
+    yanıtın bir kısmını almışken ayrıca genel hata mesajı gönderilmez.
+    """
+    chunks = [escape_markdown_v2(part) for part in _split_message(response)]
+    failed = 0
+    for i, chunk in enumerate(chunks):
+        try:
+            if i == 0 and placeholder is not None:
+                await placeholder.edit_text(chunk, parse_mode='MarkdownV2')
+            else:
+                await update.message.reply_text(chunk, parse_mode='MarkdownV2')
+        except Exception as e:
+            # Önizleme zaten aynı metni gösteriyorsa Telegram düzenlemeyi reddeder; bu başarıdır
+            if "Message is not modified" in str(e):
+                continue
+            failed += 1
+            logger.error("Yanıt parçası %s/%s gönderilemedi (chat_id=%s): %s", i + 1, len(chunks), chat_id, e)
+    if failed == len(chunks):
+        await update.message.reply_text(GENERIC_ERROR_MDV2, parse_mode='MarkdownV2')
+
 async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if not update.message or not update.message.text: return
     chat_id = update.effective_chat.id
     user_text = update.message.text
     await context.bot.send_chat_action(chat_id=chat_id, action="typing")
     
+    # Akış sırasında kısmi yanıt düz metin olarak tek bir mesajda güncellenir (yarım kalmış
+    # biçimlendirme MarkdownV2 hatası vermesin diye); son hali MarkdownV2 ile yazılır.
+    placeholder = None
+    last_edit = 0.0
+
+    async def on_partial(text: str) -> None:
+        nonlocal placeholder, last_edit
+        now = time.monotonic()
+        if now - last_edit < STREAM_EDIT_INTERVAL:
+            return
+        last_edit = now
+        preview = text[:MESSAGE_CHUNK_CHARS]
+        try:
+            if placeholder is None:
+                placeholder = await update.message.reply_text(preview)
+            else:
+                await placeholder.edit_text(preview)
+        except Exception as e:
+            logger.debug("Kısmi yanıt güncellenemedi: %s", e)
+
     try:
-        response = await handle_message_with_agent(user_text, chat_id, context)
-        safe_response = escape_markdown_v2(response)
-        await update.message.reply_text(safe_response, parse_mode='MarkdownV2')
+        response = await asyncio.wait_for(
+            handle_message_with_agent(user_text, chat_id, context, on_partial),
+            timeout=TOOL_LOOP_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Agent döngüsü %s sn içinde tamamlanmadı (chat_id=%s)", TOOL_LOOP_TIMEOUT, chat_id)
+        await update.message.reply_text(TIMEOUT_ERROR_MDV2, parse_mode='MarkdownV2')
+        return
     except Exception as e:
         logger.error(f"Telegram Handler Hata: {e}", exc_info=True)
-        await update.message.reply_text(r"⚠️ Üzgünüm, şu an isteğinizi işleyemiyorum\. Lütfen tekrar deneyin\.", parse_mode='MarkdownV2')
+        await update.message.reply_text(GENERIC_ERROR_MDV2, parse_mode='MarkdownV2')
+        return
+
+    await _send_chunks(update, placeholder, response, chat_id)
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     clinic = get_config().get_clinic_display_name()
@@ -195,7 +723,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         f"🦷 *Hoş Geldiniz\! Ben {escape_markdown_v2(clinic)} dijital asistanıyım\.*\n\n"
         f"Size nasıl yardımcı olabilirim?"
     )
-    context.user_data["history"] = [SystemMessage(content=get_system_prompt())]
+    _reset_history(context)
     await update.message.reply_text(welcome, parse_mode='MarkdownV2')
 
 def create_telegram_app() -> Application:
@@ -203,13 +731,30 @@ def create_telegram_app() -> Application:
     token = config.get_telegram_bot_token()
     if not token: raise ValueError("TELEGRAM_BOT_TOKEN eksik!")
     
-    app = Application.builder().token(token).build()
+    version = http_version()
+    app = (
+        Application.builder()
+        .token(token)
+        # Bot API çağrıları (yanıt, düzenleme) için kalıcı bağlantı havuzu
+        .request(HTTPXRequest(connection_pool_size=TELEGRAM_POOL_SIZE, pool_timeout=TELEGRAM_POOL_TIMEOUT, http_version=version))
+        .get_updates_request(HTTPXRequest(http_version=version))
+        .build()
+    )
     app.add_handler(CommandHandler("start", start_command))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, message_handler))
     return app
 
 async def run_telegram_bot(application: Application) -> None:
+    """Hasta botunu iptal edilene kadar çalıştırır; iptalde düzgünce kapatır."""
     logger.info("Hasta Botu (Telegram) başlatılıyor...")
     await application.initialize()
     await application.start()
-    await application.updater.start_polling(drop_pending_updates=True)
\ No newline at end of file
+    await application.updater.start_polling(drop_pending_updates=True)
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        logger.info("Hasta Botu durduruluyor...")
+        await application.updater.stop()
+        await application.stop()
+        await application.shutdown()
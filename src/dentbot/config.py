@@ -3,15 +3,22 @@ from __future__ import annotations
 import importlib
 import os
 import logging
-from typing import Optional, Type, Dict, Any
+import re
+from contextlib import nullcontext
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Optional, Type, Dict, Any, Mapping, Tuple
 from urllib.parse import parse_qs
 
-try:
-    from dotenv import load_dotenv
+# .env dosyası zaten ortam değişkenleriyle çalışan (container/CI) kurulumlarda
+# DENTBOT_SKIP_DOTENV=1 ile atlanır; dotenv paketi hiç import edilmez.
+if not os.environ.get("DENTBOT_SKIP_DOTENV"):
+    try:
+        from dotenv import load_dotenv
 
-    load_dotenv()
-except Exception:
-    pass
+        load_dotenv()
+    except Exception:
+        pass
 
 from dentbot.base_config import DentBotConfig
 from dentbot.adapters.base import AppointmentAdapter
@@ -24,8 +31,14 @@ CONFIG_ENV_KEY = "DENTBOT_CONFIG"
 
 logger = logging.getLogger(__name__)
 
+# CLINIC_WORKING_HOURS öğeleri: "<gün>: <saatler>" (ör. "Pazartesi: 09:00-18:00, Pazar: Kapalı").
+# Gün adı harfle başlar (Türkçe karakterler dahil); değer bir sonraki virgüle kadar sürer.
+_HOURS_RE = re.compile(r'([^\W\d_][^,:]*?)\s*:\s*([^,]*[^,\s])')
+
 
+@lru_cache(maxsize=None)
 def _import_config_class(path: str) -> Type[DentBotConfig]:
+    """Nokta ile ayrılmış yoldan config sınıfını yükler; aynı yol için sonuç önbellektedir."""
     try:
         module_path, class_name = path.rsplit(".", 1)
     except ValueError as exc:
@@ -51,31 +64,52 @@ class EnvironmentDentBotConfig(DentBotConfig):
     """Default configuration that reads from environment variables."""
 
     def __init__(self) -> None:
-        self._env = os.environ
+        # Ortam değişkenleri süreç başladıktan sonra değişmez; bir kez okunup saklanır.
+        env = os.environ
+        self._database_url = env.get("DATABASE_URL", "sqlite:///dentbot.db")
+        self._groq_api_key = env.get("GROQ_API_KEY")
+        self._groq_model = env.get("GROQ_MODEL", "llama-3.1-70b-versatile")
+        # 60 saniye varsayılan değer; sayı olmayan değerler için istisna yerine ön kontrol
+        timeout = env.get("LLM_TIMEOUT", "60").strip()
+        self._llm_timeout = int(timeout) if timeout.isdecimal() else 60
+        self._telegram_bot_token = env.get("TELEGRAM_BOT_TOKEN")
+        self._dentist_telegram_token = env.get("DENTIST_TELEGRAM_TOKEN")
+        self._clinic_name = env.get("CLINIC_NAME", "DentBot Dental Clinic")
+        self._clinic_address = env.get("CLINIC_ADDRESS")
+        self._clinic_phone = env.get("CLINIC_PHONE")
+        self._clinic_email = env.get("CLINIC_EMAIL")
+        self._working_hours = MappingProxyType(self._parse_working_hours(env.get("CLINIC_WORKING_HOURS", "")))
+        self._system_prompt_override = env.get("DENTBOT_SYSTEM_PROMPT")
+
+    @staticmethod
+    def _parse_working_hours(hours_str: str) -> Dict[str, str]:
+        """'Gün: saatler, Gün: saatler' biçimini tek regex taramasıyla sözlüğe çevirir."""
+        if not hours_str:
+            return {}
+        hours_dict = dict(_HOURS_RE.findall(hours_str))
+        if not hours_dict:
+            logger.warning(f"Invalid format for CLINIC_WORKING_HOURS: {hours_str}")
+        return hours_dict
 
     # --- ZORUNLU ABSTRACT METOTLARIN IMPLEMENTASYONU ---
     
     def get_database_url(self) -> str:
-        return self._env.get("DATABASE_URL", "sqlite:///dentbot.db")
+        return self._database_url
 
     def get_groq_api_key(self) -> Optional[str]:
-        return self._env.get("GROQ_API_KEY")
+        return self._groq_api_key
 
     def get_groq_model(self) -> str:
-        return self._env.get("GROQ_MODEL", "llama-3.1-70b-versatile")
+        return self._groq_model
 
     def get_llm_timeout(self) -> int:
-        try:
-            # 60 saniye varsayılan değer
-            return int(self._env.get("LLM_TIMEOUT", "60"))
-        except (TypeError, ValueError):
-            return 60
+        return self._llm_timeout
 
     def get_telegram_bot_token(self) -> Optional[str]:
-        return self._env.get("TELEGRAM_BOT_TOKEN")
+        return self._telegram_bot_token
 
     def get_dentist_telegram_token(self) -> Optional[str]:
-        return self._env.get("DENTIST_TELEGRAM_TOKEN")
+        return self._dentist_telegram_token
     
     def create_adapter(self) -> AppointmentAdapter:
         """
@@ -90,41 +124,28 @@ class EnvironmentDentBotConfig(DentBotConfig):
     # --- VARSAYILAN METOTLARIN OVERRIDE EDİLMESİ ---
     
     def get_clinic_display_name(self) -> str:
-        return self._env.get("CLINIC_NAME", "DentBot Dental Clinic")
+        return self._clinic_name
     
     def get_clinic_address(self) -> Optional[str]:
-        return self._env.get("CLINIC_ADDRESS")
+        return self._clinic_address
 
     def get_clinic_phone(self) -> Optional[str]:
-        return self._env.get("CLINIC_PHONE")
+        return self._clinic_phone
 
     def get_clinic_email(self) -> Optional[str]:
-        return self._env.get("CLINIC_EMAIL")
+        return self._clinic_email
     
-    def get_clinic_working_hours(self) -> Dict[str, str]:
-        hours_str = self._env.get("CLINIC_WORKING_HOURS", "")
-        if not hours_str:
-            return {}
-        
-        hours_dict = {}
-        try:
-            for item in hours_str.split(','):
-                if ':' in item:
-                    day, times = item.split(':', 1)
-                    hours_dict[day.strip()] = times.strip()
-        except Exception:
-            logger.warning(f"Invalid format for CLINIC_WORKING_HOURS: {hours_str}")
-            return {}
-
-        return hours_dict
+    def get_clinic_working_hours(self) -> Mapping[str, str]:
+        """Başlangıçta ayrıştırılmış, salt-okunur çalışma saatleri."""
+        return self._working_hours
 
 
-    def get_system_prompt(self) -> str:
-        prompt = self._env.get("DENTBOT_SYSTEM_PROMPT")
-        if prompt:
-            return prompt
+    def _build_system_prompt(self) -> str:
+        # Sonuç base class'ta önbelleğe alınır; set_config(None) sonrası yeni instance yeniden üretir.
+        if self._system_prompt_override:
+            return self._system_prompt_override
         # Base class'tan miras alır
-        return super().get_system_prompt()
+        return super()._build_system_prompt()
     
     # KRİTİK: ÇEKİRDEKTEKİ seed_database BOŞ BIRAKILIR
     def seed_database(self, adapter: AppointmentAdapter) -> None:
@@ -132,18 +153,66 @@ class EnvironmentDentBotConfig(DentBotConfig):
         return None 
 
 
+# DemoSeededDentBotConfig'in yüklediği örnek veriler
+DEMO_TREATMENTS: Tuple[Dict[str, Any], ...] = (
+    {"name": "Muayene", "duration_minutes": 30, "price": 500.0, "description": "Genel ağız ve diş kontrolü", "requires_approval": 0},
+    {"name": "Diş Temizliği", "duration_minutes": 45, "price": 1200.0, "description": "Detartraj ve parlatma"},
+    {"name": "Dolgu", "duration_minutes": 60, "price": 1500.0, "description": "Kompozit dolgu"},
+    {"name": "Kanal Tedavisi", "duration_minutes": 90, "price": 4000.0, "description": "Tek kanal tedavisi"},
+    {"name": "Diş Çekimi", "duration_minutes": 30, "price": 1000.0, "description": "Basit diş çekimi"},
+)
+
+DEMO_DENTISTS: Tuple[Dict[str, Any], ...] = (
+    {"full_name": "Dt. Ayşe Yılmaz", "specialty": "Genel Diş Hekimliği", "working_days": "Monday,Tuesday,Wednesday,Thursday,Friday",
+     "start_time": "09:00", "end_time": "18:00", "break_start": "12:30", "break_end": "13:30"},
+    {"full_name": "Dt. Mehmet Kaya", "specialty": "Endodonti", "working_days": "Monday,Wednesday,Friday",
+     "start_time": "10:00", "end_time": "17:00", "break_start": "13:00", "break_end": "14:00"},
+)
+
+
+class DemoSeededDentBotConfig(EnvironmentDentBotConfig):
+    """
+    Demo/geliştirme ortamı için örnek doktor ve tedavileri yükleyen config.
+    Kullanım: DENTBOT_CONFIG=dentbot.config.DemoSeededDentBotConfig
+    """
+
+    def create_adapter(self) -> AppointmentAdapter:
+        adapter = super().create_adapter()
+        self.seed_database(adapter)
+        return adapter
+
+    def seed_database(self, adapter: AppointmentAdapter) -> None:
+        """Tablolar boşsa örnek verileri ekler; dolu tabloya dokunmaz."""
+        # Tüm eklemeler tek transaction'da (tek commit); transaction desteklemeyen adaptörlerde normal akış.
+        transaction = getattr(adapter, "transaction", nullcontext)
+        with transaction():
+            if not adapter.list_treatments(is_active=None):
+                logger.info("Demo tedavi verileri ekleniyor...")
+                for treatment in DEMO_TREATMENTS:
+                    adapter.create_treatment(dict(treatment))
+
+            if not adapter.list_dentists(is_active=None):
+                logger.info("Demo doktor verileri ekleniyor...")
+                for dentist in DEMO_DENTISTS:
+                    adapter.create_dentist(dict(dentist))
+
+
+# set_config ile verilen instance; yoksa DENTBOT_CONFIG'ten üretilen (lru_cache) kullanılır.
 _CONFIG: Optional[DentBotConfig] = None
 
 
+@lru_cache(maxsize=1)
+def _load_config() -> DentBotConfig:
+    class_path = os.getenv(CONFIG_ENV_KEY, DEFAULT_CONFIG_CLASS)
+    return _import_config_class(class_path)()
+
+
 def get_config() -> DentBotConfig:
-    global _CONFIG
-    if _CONFIG is None:
-        class_path = os.getenv(CONFIG_ENV_KEY, DEFAULT_CONFIG_CLASS)
-        cls = _import_config_class(class_path)
-        _CONFIG = cls()
-    return _CONFIG
+    return _CONFIG or _load_config()
 
 
 def set_config(config: Optional[DentBotConfig]) -> None:
+    """Aktif config'i değiştirir; None verilirse bir sonraki çağrıda env'den yeniden üretilir."""
     global _CONFIG
-    _CONFIG = config
\ No newline at end of file
+    _CONFIG = config
+    _load_config.cache_clear()
@@ -3,14 +3,32 @@ LLM integration with Groq and Ollama fallback.
 """
 from __future__ import annotations
 
+import atexit
 import json
 import logging
-from typing import Any, Dict, List, Optional
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import httpx
 
+from dentbot._http import http2_available
 from dentbot.config import get_config
 
+# orjson (opsiyonel C eklentisi) varsa istek/yanıt JSON'u onunla işlenir; yoksa stdlib json.
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    _loads = json.loads
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
 logger = logging.getLogger(__name__)
 
 # Groq API endpoint
@@ -20,6 +38,22 @@ GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 OLLAMA_API_URL = "http://localhost:11434/api/chat"
 
 
+_OLLAMA_CONNECT_ERROR = (
+    "Could not connect to Ollama. "
+    "Make sure Ollama is running on localhost:11434. "
+    "You can install Ollama from https://ollama.ai"
+)
+
+
+# Art arda bu kadar Groq hatasından sonra Groq, GROQ_COOLDOWN_SECONDS boyunca denenmez
+GROQ_FAILURE_THRESHOLD = 3
+GROQ_COOLDOWN_SECONDS = 30
+
+
+# Ollama'ya düşmeyi tetikleyen hatalar: ağ/HTTP hataları ve bozuk yanıt (programlama hataları değil)
+_GROQ_ERRORS: Tuple[type, ...] = (httpx.HTTPError, ValueError)
+
+
 class LLMClient:
     """LLM client with Groq primary and Ollama fallback."""
 
@@ -42,6 +76,61 @@ class LLMClient:
         self.model = model if model is not None else config.get_groq_model()
         self.timeout = timeout if timeout is not None else config.get_llm_timeout()
         self.use_groq = bool(self.api_key)
+        # Art arda Groq hatalarında Groq belirli bir süre atlanır (her istek zaman aşımını beklemesin)
+        self._groq_failures = 0
+        self._groq_cooldown_until = 0.0
+        self._groq_headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        self._groq_base_payload = {
+            "model": self.model,
+            "temperature": 0.7,
+            "max_tokens": 1024,
+        }
+        # Kalıcı HTTP istemcisi: TCP/TLS bağlantısı istekler arasında yeniden kullanılır
+        self._client: Optional[httpx.Client] = None
+
+    def _get_client(self) -> httpx.Client:
+        """Paylaşılan httpx.Client'ı ilk kullanımda oluşturur."""
+        if self._client is None:
+            self._client = httpx.Client(timeout=self.timeout, http2=http2_available())
+        return self._client
+
+    def close(self) -> None:
+        """Açık HTTP bağlantılarını kapatır."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    # --- Groq devre kesici ---
+
+    def _groq_available(self) -> bool:
+        """Groq anahtarı varsa ve art arda hatalar sonrası bekleme süresinde değilsek True."""
+        if not self.use_groq:
+            logger.info("No Groq API key found. Using Ollama...")
+            return False
+        if time.monotonic() < self._groq_cooldown_until:
+            logger.debug("Groq devre kesici açık; doğrudan Ollama kullanılıyor.")
+            return False
+        return True
+
+    def _record_groq_failure(self, error: Exception) -> None:
+        self._groq_failures += 1
+        if self._groq_failures >= GROQ_FAILURE_THRESHOLD:
+            self._groq_cooldown_until = time.monotonic() + GROQ_COOLDOWN_SECONDS
+            self._groq_failures = 0
+            logger.warning(f"Groq request failed: {error}. Groq {GROQ_COOLDOWN_SECONDS}s devre dışı; Ollama kullanılıyor.")
+        else:
+            logger.warning(f"Groq request failed: {error}. Trying Ollama fallback...")
+
+    @staticmethod
+    def _format_messages(messages: List[Dict[str, str]], system_prompt: Optional[str]) -> List[Dict[str, str]]:
+        # Prepare messages with system prompt if provided
+        if system_prompt:
+            return [{"role": "system", "content": system_prompt}, *messages]
+        # Alt akış listeyi değiştirmez; sistem prompt'u yoksa kopyalamaya gerek yok
+        return messages
 
     def chat(
         self,
@@ -61,54 +150,44 @@ class LLMClient:
         Raises:
             Exception: If both Groq and Ollama fail
         """
-        # Prepare messages with system prompt if provided
-        formatted_messages = []
-        if system_prompt:
-            formatted_messages.append({
-                "role": "system",
-                "content": system_prompt,
-            })
-        formatted_messages.extend(messages)
-
-        # Try Groq first if API key is available
-        if self.use_groq:
+        formatted_messages = self._format_messages(messages, system_prompt)
+
+        # Try Groq first if API key is available (and the circuit is closed)
+        if self._groq_available():
             try:
-                return self._chat_groq(formatted_messages)
-            except Exception as e:
-                logger.warning(f"Groq request failed: {e}. Trying Ollama fallback...")
-                return self._chat_ollama(formatted_messages)
+                response = self._chat_groq(formatted_messages)
+            except _GROQ_ERRORS as e:
+                self._record_groq_failure(e)
+            else:
+                self._groq_failures = 0
+                return response
+        return self._chat_ollama(formatted_messages)
+
+    # --- Groq ---
+
+    def _groq_request(self, messages: List[Dict[str, str]]) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        # Sabit kısımlar __init__'te bir kez kurulur; çağrı başına yalnızca mesajlar eklenir.
+        return self._groq_headers, {**self._groq_base_payload, "messages": messages}
+
+    @staticmethod
+    def _parse_groq(data: Dict[str, Any]) -> str:
+        # Extract content from response
+        if "choices" in data and len(data["choices"]) > 0:
+            return data["choices"][0]["message"]["content"]
         else:
-            # Use Ollama directly if no Groq API key
-            logger.info("No Groq API key found. Using Ollama...")
-            return self._chat_ollama(formatted_messages)
+            raise ValueError("Invalid response format from Groq API")
 
     def _chat_groq(self, messages: List[Dict[str, str]]) -> str:
         """Send chat request to Groq API."""
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": 0.7,
-            "max_tokens": 1024,
-        }
+        headers, payload = self._groq_request(messages)
+        response = self._get_client().post(GROQ_API_URL, headers=headers, content=_dumps(payload))
+        response.raise_for_status()
+        return self._parse_groq(_loads(response.content))
 
-        with httpx.Client(timeout=self.timeout) as client:
-            response = client.post(GROQ_API_URL, headers=headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Extract content from response
-            if "choices" in data and len(data["choices"]) > 0:
-                return data["choices"][0]["message"]["content"]
-            else:
-                raise ValueError("Invalid response format from Groq API")
+    # --- Ollama ---
 
-    def _chat_ollama(self, messages: List[Dict[str, str]]) -> str:
-        """Send chat request to Ollama API (fallback)."""
+    @staticmethod
+    def _ollama_payload(messages: List[Dict[str, str]]) -> Dict[str, Any]:
         # Ollama chat API expects messages in a specific format
         # Convert system message to a regular message if present
         ollama_messages = []
@@ -123,31 +202,99 @@ class LLMClient:
                 ollama_messages.append({"role": role, "content": content})
 
         model_name = get_config().get_ollama_model()
-        payload = {
+        return {
             "model": model_name,  # Config'ten alınan Ollama model adı
             "messages": ollama_messages,
             "stream": False,
         }
 
+    @staticmethod
+    def _parse_ollama(data: Dict[str, Any]) -> str:
+        if "message" in data and "content" in data["message"]:
+            return data["message"]["content"]
+        elif "response" in data:
+            # Fallback for older Ollama API format
+            return data["response"]
+        else:
+            raise ValueError("Invalid response format from Ollama API")
+
+    def _chat_ollama(self, messages: List[Dict[str, str]]) -> str:
+        """Send chat request to Ollama API (fallback)."""
+        payload = self._ollama_payload(messages)
+        client = self._get_client()
+
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.post(OLLAMA_API_URL, json=payload)
+            response = client.post(OLLAMA_API_URL, headers=_JSON_HEADERS, content=_dumps(payload))
+            response.raise_for_status()
+            return self._parse_ollama(_loads(response.content))
+        except httpx.ConnectError:
+            raise ConnectionError(_OLLAMA_CONNECT_ERROR)
+
+    # --- Streaming ---
+
+    def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        chat() ile aynı istek, ancak yanıt parçaları geldikçe üretilir (ilk token beklenmeden gösterilebilir).
+        Groq ilk parçadan önce hata verirse Ollama'ya düşülür; akış başladıktan sonraki hatalar yükseltilir.
+        """
+        formatted_messages = self._format_messages(messages, system_prompt)
+
+        if self._groq_available():
+            started = False
+            try:
+                for piece in self._stream_groq(formatted_messages):
+                    started = True
+                    yield piece
+                self._groq_failures = 0
+                return
+            except _GROQ_ERRORS as e:
+                if started:
+                    raise
+                self._record_groq_failure(e)
+        yield from self._stream_ollama(formatted_messages)
+
+    def _stream_groq(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """Groq SSE akışı: her 'data: {...}' satırındaki delta içeriğini üretir."""
+        headers, payload = self._groq_request(messages)
+        payload["stream"] = True
+        with self._get_client().stream("POST", GROQ_API_URL, headers=headers, content=_dumps(payload)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                choices = _loads(data).get("choices")
+                if choices:
+                    content = choices[0].get("delta", {}).get("content")
+                    if content:
+                        yield content
+
+    def _stream_ollama(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """Ollama akışı: satır başına bir JSON nesnesi (NDJSON)."""
+        payload = self._ollama_payload(messages)
+        payload["stream"] = True
+        client = self._get_client()
+
+        try:
+            with client.stream("POST", OLLAMA_API_URL, headers=_JSON_HEADERS, content=_dumps(payload)) as response:
                 response.raise_for_status()
-                data = response.json()
-                
-                if "message" in data and "content" in data["message"]:
-                    return data["message"]["content"]
-                elif "response" in data:
-                    # Fallback for older Ollama API format
-                    return data["response"]
-                else:
-                    raise ValueError("Invalid response format from Ollama API")
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = _loads(line)
+                    content = chunk.get("message", {}).get("content")
+                    if content:
+                        yield content
+                    if chunk.get("done"):
+                        break
         except httpx.ConnectError:
-            raise ConnectionError(
-                "Could not connect to Ollama. "
-                "Make sure Ollama is running on localhost:11434. "
-                "You can install Ollama from https://ollama.ai"
-            )
+            raise ConnectionError(_OLLAMA_CONNECT_ERROR)
 
     def simple_query(self, question: str, system_prompt: Optional[str] = None) -> str:
         """
@@ -169,16 +316,20 @@ class LLMClient:
         return self.chat(messages, system_prompt=system_prompt)
 
 
-# Global LLM client instance
+# Global LLM client instance (set_llm_client ile verilen öncelikli)
 _llm_client: Optional[LLMClient] = None
 
 
+@lru_cache(maxsize=1)
+def _default_llm_client() -> LLMClient:
+    client = LLMClient()
+    atexit.register(client.close)
+    return client
+
+
 def get_llm_client() -> LLMClient:
     """Get or create the global LLM client instance."""
-    global _llm_client
-    if _llm_client is None:
-        _llm_client = LLMClient()
-    return _llm_client
+    return _llm_client or _default_llm_client()
 
 
 def set_llm_client(client: LLMClient) -> None:
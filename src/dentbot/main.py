@@ -1,28 +1,31 @@
 from __future__ import annotations
 import asyncio
 import logging
-import sys
-import os
+import signal
 
 from dentbot.channels import (
     run_telegram_bot,
     create_telegram_app,
     run_dentist_panel,
     create_dentist_panel_app,
+    invalidate_availability_cache,
 )
 from dentbot.tools import get_adapter, set_approval_service
 from dentbot.services import NotificationService, ApprovalService
 
-logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Kapanışta bekleyen onay özetlerinin gönderilmesi için en fazla beklenen süre (sn)
+DIGEST_FLUSH_TIMEOUT = 5.0
+
 async def run_bots_parallel(patient_app, dentist_app):
     """
     Kritik: NotificationService ve ApprovalService loop içindeyken kurulmalı.
     """
     adapter = get_adapter()
     
-    # 1. Servisleri aktif loop üzerinde başlat
+    # 1. Servisleri aktif loop üzerinde başlat. Her servis kendi uygulamasının Bot'unu
+    # (dolayısıyla onun kalıcı HTTPXRequest havuzunu) paylaşır; yeni Bot oluşturulmaz.
     patient_notif = NotificationService(telegram_bot=patient_app.bot)
     dentist_notif = NotificationService(telegram_bot=dentist_app.bot)
 
@@ -32,14 +35,58 @@ async def run_bots_parallel(patient_app, dentist_app):
         dentist_notification_service=dentist_notif,
     )
     set_approval_service(approval_service)
+    # Panelden onay/red hasta botunun slot önbelleğini düşürür; önbellek loop thread'inde
+    # değiştirilir (servis bir worker thread'inden çağrılsa bile).
+    loop = asyncio.get_running_loop()
+    approval_service.add_state_listener(lambda: loop.call_soon_threadsafe(invalidate_availability_cache))
+    # Panel handler'ları servisi global lookup yerine bot_data üzerinden okur.
+    dentist_app.bot_data['approval_service'] = approval_service
 
     logger.info("Starting Parallel Bot Execution...")
-    await asyncio.gather(
+    bots = asyncio.gather(
         run_telegram_bot(patient_app),
         run_dentist_panel(dentist_app)
     )
+    # Sinyaller süreç genelinde tek yerden yönetilir: SIGINT/SIGTERM iki botu birlikte durdurur
+    stop = asyncio.Event()
+    installed = _install_stop_signals(stop)
+    stopper = asyncio.create_task(stop.wait())
+    try:
+        await asyncio.wait({bots, stopper}, return_when=asyncio.FIRST_COMPLETED)
+        if bots.done():
+            bots.result()  # Bir bot beklenmedik şekilde durduysa hatayı yükselt
+        else:
+            logger.info("Durdurma sinyali alındı; botlar kapatılıyor...")
+    finally:
+        stopper.cancel()
+        # Özet penceresinde bekleyen onay talepleri botlar kapanmadan gönderilir
+        flushed = [asyncio.wrap_future(f) for f in approval_service.flush_pending_digests() if f is not None]
+        if flushed:
+            await asyncio.wait(flushed, timeout=DIGEST_FLUSH_TIMEOUT)
+        bots.cancel()
+        # Botların kapanış (finally) adımlarının bitmesi beklenir
+        await asyncio.gather(bots, return_exceptions=True)
+        for sig in installed:
+            loop.remove_signal_handler(sig)
+        # PTB ve bildirim thread'lerinin açtığı DB bağlantıları da kapatılır
+        adapter.close()
+
+def _install_stop_signals(stop: asyncio.Event) -> list:
+    """SIGINT/SIGTERM'de stop olayını tetikler; kurulabilen sinyalleri döner."""
+    loop = asyncio.get_running_loop()
+    installed = []
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows'ta sinyal handler'ı yok; KeyboardInterrupt ile durulur.
+            continue
+        installed.append(sig)
+    return installed
 
 def main():
+    # Kök logger yalnızca uygulama çalıştırılırken ayarlanır; modülü import etmek (testler vb.) ayarı değiştirmez.
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
     try:
         patient_app = create_telegram_app()
         dentist_app = create_dentist_panel_app()
@@ -1,9 +1,38 @@
 from __future__ import annotations
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from datetime import datetime
-from typing import Optional, Dict, Any, ClassVar
+from functools import cached_property
+from typing import Optional, Dict, Any, Callable, ClassVar, FrozenSet
+import json
+import sys
 import uuid
 
+# orjson (opsiyonel C eklentisi) varsa to_json onunla serileştirir; yoksa stdlib json.
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+# Telegram MarkdownV2 özel karakterleri (ters bölü dahil) için çeviri tablosu; kısa
+# metinlerde str.translate, regex'ten belirgin şekilde hızlıdır.
+_MDV2_TABLE = str.maketrans({c: '\\' + c for c in '_*[]()~`>#+-=|{}.!\\'})
+
+
+# created_at hem SQLite'ın CURRENT_TIMESTAMP'ı ('YYYY-MM-DD HH:MM:SS') hem isoformat() çıktısıdır;
+# ikisini de C ile yazılmış fromisoformat ayrıştırır (Python'da dilimleyip int() ile kurmaktan hızlı).
+_parse_iso = datetime.fromisoformat
+
+
+def escape_markdown_v2(text: Any) -> str:
+    """MarkdownV2 özel karakterlerini kaçırır."""
+    if text is None:
+        return ""
+    return str(text).translate(_MDV2_TABLE)
+
+
 @dataclass
 class Appointment:
     """Diş Kliniği Randevu Modeli."""
@@ -24,10 +53,13 @@ class Appointment:
     patient_chat_id: Optional[int] = field(default=None) # ⭐ KRİTİK: Hasta Telegram Chat ID'si eklendi
 
     # Durum ve Zaman Bilgileri (Sınıf değişkenleri)
-    STATUS_PENDING: ClassVar[str] = "pending"
-    STATUS_APPROVED: ClassVar[str] = "approved"
-    STATUS_COMPLETED: ClassVar[str] = "completed"
-    STATUS_CANCELLED: ClassVar[str] = "cancelled"
+    # Durumlar intern edilir; from_dict DB'den gelen değerleri de aynı nesnelere bağlar,
+    # böylece is_* karşılaştırmaları çoğunlukla işaretçi eşitliğinde sonuçlanır.
+    STATUS_PENDING: ClassVar[str] = sys.intern("pending")
+    STATUS_APPROVED: ClassVar[str] = sys.intern("approved")
+    STATUS_COMPLETED: ClassVar[str] = sys.intern("completed")
+    STATUS_CANCELLED: ClassVar[str] = sys.intern("cancelled")
+    _VALID_STATUSES: ClassVar[FrozenSet[str]] = frozenset({STATUS_PENDING, STATUS_APPROVED, STATUS_COMPLETED, STATUS_CANCELLED})
     
     status: str = field(default=STATUS_PENDING)
     created_at: Optional[datetime] = field(default_factory=datetime.now)
@@ -36,11 +68,54 @@ class Appointment:
     # Metodlar
     # ------------------------------------
 
+    @staticmethod
+    def reference_code_for(appointment_id: int) -> str:
+        """Kayıtlı bir randevu ID'si için 'APT-000123' formatında referans kodu döner."""
+        return f"APT-{appointment_id:06d}"
+
     def get_reference_code(self) -> str:
-        """'APT-000123' formatında referans kodu üretir."""
+        """'APT-000123' formatında referans kodu döner (kayıtsız randevu için geçici bir TEMP kodu)."""
+        return self.ref_code
+
+    # Referans kodu yalnızca id atandıktan sonra saklanır: kayıtsız randevunun TEMP kodu
+    # önbelleğe alınırsa, id sonradan atandığında bayat kod bildirimlere gider.
+    @property
+    def ref_code(self) -> str:
+        code = self.__dict__.get('_ref_code')
+        if code is not None:
+            return code
+        if self.id is None:
+            return f"TEMP-{uuid.uuid4().hex[:6].upper()}"
+        code = self.__dict__['_ref_code'] = self.reference_code_for(self.id)
+        return code
+
+    @property
+    def ref_code_mdv2(self) -> str:
+        code = self.__dict__.get('_ref_code_mdv2')
+        if code is not None:
+            return code
+        code = escape_markdown_v2(self.ref_code)
         if self.id is not None:
-            return f"APT-{self.id:06d}"
-        return f"TEMP-{uuid.uuid4().hex[:6].upper()}"
+            self.__dict__['_ref_code_mdv2'] = code
+        return code
+
+    # Türetilmiş alanlar; ilk erişimde hesaplanıp instance üzerinde saklanır.
+    # Bu alanlar randevu oluşturulduktan sonra değişmediği için önbellek geçersizleştirilmez.
+    @cached_property
+    def appointment_date_mdv2(self) -> str:
+        return escape_markdown_v2(self.appointment_date)
+
+    @cached_property
+    def time_slot_mdv2(self) -> str:
+        return escape_markdown_v2(self.time_slot)
+
+    @cached_property
+    def patient_name_mdv2(self) -> str:
+        return escape_markdown_v2(self.patient_name)
+
+    @cached_property
+    def treatment_type_mdv2(self) -> str:
+        return escape_markdown_v2(self.treatment_type)
 
     def is_pending(self) -> bool:
         return self.status == self.STATUS_PENDING
@@ -54,28 +129,59 @@ class Appointment:
     def is_cancelled(self) -> bool:
         return self.status == self.STATUS_CANCELLED
 
-    def to_dict(self) -> Dict[str, Any]:
-        data = self.__dict__.copy()
-        if isinstance(data.get('created_at'), datetime):
-            data['created_at'] = data['created_at'].isoformat()
-        
-        for key in list(data.keys()):
-            if key.startswith('STATUS_'):
-                data.pop(key)
-                
-        return data
+    # to_dict() sınıf tanımından sonra _build_to_dict ile alan listesinden üretilir.
+    to_dict: ClassVar[Callable[[Appointment], Dict[str, Any]]]
+    # from_dict'in süzgeci: alan adları sınıf başına bir kez hesaplanır
+    _FIELD_NAMES: ClassVar[FrozenSet[str]]
+
+    def to_json(self) -> bytes:
+        """
+        Randevuyu UTF-8 JSON byte'larına çevirir. Nesnenin kendisi değil to_dict() çıktısı
+        serileştirilir: orjson dataclass'ı __dict__ üzerinden okur ve önbellekteki *_mdv2
+        değerlerini de yazardı.
+        """
+        return _dumps(self.to_dict())
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> Appointment:
-        data = data.copy()
-        created_at_str = data.get('created_at')
+        filtered_data = {k: data[k] for k in cls._FIELD_NAMES.intersection(data)}
+        status = filtered_data.get('status')
+        # Yalnızca bilinen durumlar intern edilir; beklenmeyen değerler intern tablosunu büyütmez
+        if status in cls._VALID_STATUSES:
+            filtered_data['status'] = sys.intern(status)
+        created_at_str = filtered_data.get('created_at')
         if created_at_str and isinstance(created_at_str, str):
             try:
-                data['created_at'] = datetime.fromisoformat(created_at_str)
+                filtered_data['created_at'] = _parse_iso(created_at_str)
             except ValueError:
-                data['created_at'] = None
-                
-        field_names = {f.name for f in cls.__dataclass_fields__.values()}
-        filtered_data = {k: v for k, v in data.items() if k in field_names}
+                filtered_data['created_at'] = None
+
+        return cls(**filtered_data)
+
+
+def _build_to_dict(cls: type) -> None:
+    """
+    to_dict'i alan listesinden bir kez üretir: her çağrı __dict__ kopyalayıp filtrelemek
+    yerine alanları doğrudan okuyan tek bir dict literal'i çalıştırır. cached_property
+    ile saklanan *_mdv2 değerleri alan olmadığı için çıktıya girmez; ref_code ise eklenir
+    (from_dict onu alan olmadığı için yok sayar).
+    """
+    items = []
+    for f in fields(cls):
+        if f.name == "created_at":
+            items.append("'created_at': self.created_at.isoformat() if isinstance(self.created_at, _datetime) else self.created_at")
+        else:
+            items.append(f"{f.name!r}: self.{f.name}")
+    # Referans kodu da eklenir; bildirimler onu yeniden biçimlendirmeden kullanır
+    items.append("'ref_code': self.ref_code")
+    source = "def to_dict(self):\n    return {" + ", ".join(items) + "}\n"
+    namespace: Dict[str, Any] = {"_datetime": datetime}
+    exec(source, namespace)
+    to_dict = namespace["to_dict"]
+    to_dict.__qualname__ = f"{cls.__qualname__}.to_dict"
+    to_dict.__doc__ = "Randevuyu JSON uyumlu dict'e çevirir (created_at ISO string olarak)."
+    cls.to_dict = to_dict
+
 
-        return cls(**filtered_data)
\ No newline at end of file
+_build_to_dict(Appointment)
+Appointment._FIELD_NAMES = frozenset(f.name for f in fields(Appointment))
@@ -1,6 +1,6 @@
 from __future__ import annotations
-from dataclasses import dataclass, field
-from typing import Optional, Dict, Any, List
+from dataclasses import dataclass, field, fields
+from typing import Optional, Dict, Any, ClassVar, FrozenSet, List
 
 @dataclass
 class Dentist:
@@ -24,6 +24,8 @@ class Dentist:
     break_start: str = field(default="12:00") # Öğle Arası Başlangıcı
     break_end: str = field(default="13:00")   # Öğle Arası Bitişi
     slot_duration: int = field(default=30)  # Dakika cinsinden randevu süresi
+
+    _FIELD_NAMES: ClassVar[FrozenSet[str]]
     
     # ------------------------------------
     # Metodlar
@@ -50,7 +52,9 @@ class Dentist:
         else:
             data['working_days'] = []
 
-        field_names = {f.name for f in cls.__dataclass_fields__.values()}
-        filtered_data = {k: v for k, v in data.items() if k in field_names}
+        filtered_data = {k: data[k] for k in cls._FIELD_NAMES.intersection(data)}
+        return cls(**filtered_data)
+
 
-        return cls(**filtered_data)
\ No newline at end of file
+# from_dict'in süzgeci: alan adları sınıf başına bir kez hesaplanır
+Dentist._FIELD_NAMES = frozenset(f.name for f in fields(Dentist))
\ No newline at end of file
@@ -1,6 +1,6 @@
 from __future__ import annotations
-from dataclasses import dataclass, field
-from typing import Optional, Dict, Any
+from dataclasses import dataclass, field, fields
+from typing import Optional, Dict, Any, ClassVar, FrozenSet
 
 @dataclass
 class Treatment:
@@ -19,6 +19,8 @@ class Treatment:
     requires_approval: bool = field(default=True) # Bu randevu için doktor onayı gerekli mi?
     is_active: bool = field(default=True)
 
+    _FIELD_NAMES: ClassVar[FrozenSet[str]]
+
     # ------------------------------------
     # Metodlar
     # ------------------------------------
@@ -30,8 +32,9 @@ class Treatment:
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> Treatment:
         """Sözlükten dataclass örneği oluşturur."""
-        
-        field_names = {f.name for f in cls.__dataclass_fields__.values()}
-        filtered_data = {k: v for k, v in data.items() if k in field_names}
+        filtered_data = {k: data[k] for k in cls._FIELD_NAMES.intersection(data)}
+        return cls(**filtered_data)
+
 
-        return cls(**filtered_data)
\ No newline at end of file
+# from_dict'in süzgeci: alan adları sınıf başına bir kez hesaplanır
+Treatment._FIELD_NAMES = frozenset(f.name for f in fields(Treatment))
\ No newline at end of file
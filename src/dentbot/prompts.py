@@ -10,4 +10,9 @@ from dentbot.config import get_config
 def get_system_prompt() -> str:
     """Aktif config tarafından sağlanan sistem prompt'unu döndürür."""
     # Config'teki get_system_prompt metodunu çağırır (base_config'te tanımlı)
-    return get_config().get_system_prompt()
\ No newline at end of file
+    return get_config().get_system_prompt()
+
+
+def get_dynamic_context() -> str:
+    """Kullanıcı mesajının başına eklenecek tarih/saat bağlamını döndürür."""
+    return get_config().get_dynamic_context()
\ No newline at end of file
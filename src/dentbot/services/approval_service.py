@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List, Optional, Tuple
 
 from dentbot.adapters.base import AppointmentAdapter
 from dentbot.services.notification_service import NotificationService
@@ -10,6 +13,33 @@ from dentbot.exceptions import AppointmentError, DatabaseError
 
 logger = logging.getLogger(__name__)
 
+# Bekleyen randevuların Appointment nesneleri: id -> (sürüm, Appointment).
+# Şemada updated_at yoksa satırın kendi değerleri sürüm olarak kullanılır; satır
+# değişirse anahtar tutmaz ve nesne yeniden oluşturulur. Onay/red'de id ile silinir.
+_APPT_CACHE: "OrderedDict[int, Tuple[Any, Appointment]]" = OrderedDict()
+_APPT_CACHE_MAXSIZE = 256
+
+# Doktora giden ilk onay talebi hemen gönderilir; ardından bu süre (sn) içinde gelenler
+# biriktirilip tek özet mesajında gönderilir
+APPROVAL_DIGEST_DELAY = 2.0
+# Tek özet mesajındaki en fazla randevu (Telegram 4096 karakter ve buton sınırları)
+APPROVAL_DIGEST_MAX_ITEMS = 10
+
+
+def _cached_appointment(app_data: Dict[str, Any]) -> Appointment:
+    app_id = app_data['id']
+    version = app_data.get('updated_at') or tuple(app_data.values())
+    cached = _APPT_CACHE.get(app_id)
+    if cached is not None and cached[0] == version:
+        _APPT_CACHE.move_to_end(app_id)
+        return cached[1]
+
+    app = Appointment.from_dict(app_data)
+    _APPT_CACHE[app_id] = (version, app)
+    if len(_APPT_CACHE) > _APPT_CACHE_MAXSIZE:
+        _APPT_CACHE.popitem(last=False)
+    return app
+
 
 class ApprovalService:
     """
@@ -24,10 +54,37 @@ class ApprovalService:
         self.adapter = adapter
         self.patient_notif = patient_notification_service
         self.dentist_notif = dentist_notification_service
+        # dentist_id -> Telegram chat_id; yalnızca bulunan değerler saklanır,
+        # register_dentist_chat_id kaydı günceller.
+        self._chat_id_cache: Dict[int, int] = {}
+        # dentist_id -> açık özet penceresinde biriken talepler (anahtar varsa pencere açıktır)
+        # ve pencereyi kapatacak zamanlayıcı (loop'un TimerHandle'ı veya threading.Timer)
+        self._pending_digest: Dict[int, List[Appointment]] = {}
+        self._digest_timers: Dict[int, Any] = {}
+        self._digest_lock = threading.Lock()
+        # main.py servisi bot'ların loop'u içinde kurar; özet zamanlayıcıları o loop'ta çalışır
+        try:
+            self._loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        # Onay/red sonrası çağrılır (ör. hasta botunun müsaitlik önbelleğini düşürmek için)
+        self._state_listeners: List[Callable[[], None]] = []
+
+    def add_state_listener(self, listener: Callable[[], None]) -> None:
+        """Randevu durumu onay veya redle değiştiğinde çağrılacak fonksiyonu kaydeder."""
+        self._state_listeners.append(listener)
+
+    def _notify_state_change(self) -> None:
+        for listener in self._state_listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"Durum dinleyicisi hatası: {e}")
 
     # ⭐ YENİ METOT: Doktorun Telegram Chat ID'sini kaydetmek için
     def register_dentist_chat_id(self, dentist_id: int, chat_id: int) -> None:
         """Belirtilen doktorun Telegram Chat ID'sini kaydeder."""
+        self._chat_id_cache.pop(dentist_id, None)
         try:
             self.adapter.update_dentist_chat_id(dentist_id, chat_id)
             logger.info(f"Doktor ID {dentist_id} için Chat ID {chat_id} başarıyla kaydedildi.")
@@ -40,13 +97,18 @@ class ApprovalService:
         # Not: Bu çağrı için Adapter'da `update_dentist_chat_id` ve
         # `get_dentist` metotlarının `telegram_chat_id` alanını desteklemesi gerekir.
         
+        chat_id = self._chat_id_cache.get(dentist_id)
+        if chat_id is not None:
+            return chat_id
+
         dentist_data = self.adapter.get_dentist(dentist_id)
-        chat_id = dentist_data.get('telegram_chat_id')
+        chat_id = dentist_data.get('telegram_chat_id') if dentist_data else None
         if not chat_id:
             logger.error(f"Doktor ID {dentist_id} için Telegram Chat ID bulunamadı.")
             # Hata kodunu -1 yerine 0 veya NoneType kullanmak daha temizdir,
             # ancak mevcut implementasyonda -1'i koruyoruz.
             return -1
+        self._chat_id_cache[dentist_id] = chat_id
         return chat_id
 
     def create_pending_appointment(self, appointment_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -60,29 +122,99 @@ class ApprovalService:
         except DatabaseError as e:
             raise e
         
+        # Adaptör satırı bir kez Appointment'a çevrilir; iki bildirim de aynı nesneyi kullanır
+        appointment = Appointment.from_dict(new_appointment_data)
+
         # 3. Hastaya randevu talebinin oluşturulduğunu bildir
-        patient_chat_id = new_appointment_data.get('patient_chat_id')
+        patient_chat_id = appointment.patient_chat_id
         if patient_chat_id:
             self.patient_notif.send_appointment_confirmation( 
-                new_appointment_data, 
+                appointment, 
                 patient_chat_id
             )
         
         # 4. Doktora onay talebi gönder
-        dentist_id = new_appointment_data['dentist_id']
+        dentist_id = appointment.dentist_id
         dentist_chat_id = self._get_dentist_chat_id(dentist_id)
         
         # ⭐ Hata Ayıklama Notu: Doktor Chat ID'si bulunamazsa bildirim gitmez
         if dentist_chat_id != -1: 
-            self.dentist_notif.send_approval_request( 
-                new_appointment_data, 
-                dentist_chat_id
-            )
+            self._queue_approval_request(dentist_id, appointment, dentist_chat_id)
         else:
             logger.error(f"Doktor ID {dentist_id} için bildirim gönderilemedi: Chat ID bulunamadı.")
         
         return new_appointment_data
 
+    def _queue_approval_request(self, dentist_id: int, appointment: Appointment, dentist_chat_id: int) -> None:
+        """
+        Onay talebini doktora iletir. Açık özet penceresi yoksa talep hemen gönderilir ve
+        APPROVAL_DIGEST_DELAY süren bir pencere açılır; o sürede gelenler tek özet mesajında gider.
+        """
+        with self._digest_lock:
+            queued = self._pending_digest.get(dentist_id)
+            if queued is not None:
+                queued.append(appointment)
+                return
+            self._pending_digest[dentist_id] = []
+        self.dentist_notif.send_approval_request(appointment, dentist_chat_id)
+        self._schedule_flush(dentist_id)
+
+    def _schedule_flush(self, dentist_id: int) -> None:
+        """Özet penceresini APPROVAL_DIGEST_DELAY sonra kapatır (loop yoksa arka plan zamanlayıcısıyla)."""
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            def arm() -> None:
+                with self._digest_lock:
+                    # Pencere bu arada (ör. kapanışta) boşaltıldıysa zamanlayıcı kurulmaz
+                    if dentist_id in self._pending_digest:
+                        self._digest_timers[dentist_id] = loop.call_later(
+                            APPROVAL_DIGEST_DELAY, self._flush_digest, dentist_id
+                        )
+            # Talepler araç worker thread'lerinden de gelir; zamanlayıcı loop thread'inde kurulur
+            loop.call_soon_threadsafe(arm)
+            return
+        timer = threading.Timer(APPROVAL_DIGEST_DELAY, self._flush_digest, args=(dentist_id,))
+        timer.daemon = True
+        with self._digest_lock:
+            self._digest_timers[dentist_id] = timer
+        timer.start()
+
+    def _flush_digest(self, dentist_id: int) -> List[Any]:
+        """
+        Özet penceresini kapatır ve biriken talepleri gönderir: tek talep tekil mesajla, fazlası
+        özet olarak. Gönderimlerin sonuçlarını (Future) döner.
+        """
+        with self._digest_lock:
+            appointments = self._pending_digest.pop(dentist_id, [])
+            timer = self._digest_timers.pop(dentist_id, None)
+        if timer is not None:
+            timer.cancel()
+        if not appointments:
+            return []
+
+        dentist_chat_id = self._get_dentist_chat_id(dentist_id)
+        if dentist_chat_id == -1:
+            logger.error(f"Doktor ID {dentist_id} için {len(appointments)} onay talebi gönderilemedi: Chat ID bulunamadı.")
+            return []
+
+        sent = []
+        for i in range(0, len(appointments), APPROVAL_DIGEST_MAX_ITEMS):
+            batch = appointments[i:i + APPROVAL_DIGEST_MAX_ITEMS]
+            if len(batch) == 1:
+                sent.append(self.dentist_notif.send_approval_request(batch[0], dentist_chat_id))
+            else:
+                sent.append(self.dentist_notif.send_approval_digest(batch, dentist_chat_id))
+        return sent
+
+    def flush_pending_digests(self) -> List[Any]:
+        """Tüm açık özet pencerelerini hemen gönderir (kapanışta biriken talepler kaybolmasın)."""
+        with self._digest_lock:
+            dentist_ids = list(self._pending_digest)
+        sent = []
+        for dentist_id in dentist_ids:
+            sent.extend(self._flush_digest(dentist_id))
+        return sent
+
     def approve_appointment(self, appointment_id: int) -> Dict[str, Any]:
         """
         Randevuyu onaylar, durumunu 'approved' yapar ve hastaya bildirim gönderir.
@@ -92,14 +224,16 @@ class ApprovalService:
             raise AppointmentError(f"ID {appointment_id} ile randevu bulunamadı.")
             
         approved_appointment = self.adapter.approve_appointment(appointment_id)
+        _APPT_CACHE.pop(appointment_id, None)
         if not approved_appointment:
             raise DatabaseError(f"Randevu {appointment_id} onaylanırken DB hatası.")
+        self._notify_state_change()
             
         # 3. Hastaya onay bildirimi gönder
         patient_chat_id = approved_appointment.get('patient_chat_id')
         if patient_chat_id:
             self.patient_notif.send_approval_notification( 
-                approved_appointment, 
+                Appointment.from_dict(approved_appointment), 
                 patient_chat_id
             )
         
@@ -114,14 +248,17 @@ class ApprovalService:
             raise AppointmentError(f"ID {appointment_id} ile randevu bulunamadı.")
         
         rejected_appointment = self.adapter.reject_appointment(appointment_id)
+        _APPT_CACHE.pop(appointment_id, None)
         if not rejected_appointment:
             raise DatabaseError(f"Randevu {appointment_id} reddedilirken DB hatası.")
+        # Reddedilen randevunun slotu yeniden boşalır
+        self._notify_state_change()
 
         # Hastaya red bildirimi gönder
         patient_chat_id = rejected_appointment.get('patient_chat_id')
         if patient_chat_id:
             self.patient_notif.send_rejection_notification( 
-                rejected_appointment, 
+                Appointment.from_dict(rejected_appointment), 
                 patient_chat_id
             )
         
@@ -130,5 +267,9 @@ class ApprovalService:
     def get_pending_appointments(self) -> List[Dict[str, Any]]:
         return self.adapter.list_appointments(status=Appointment.STATUS_PENDING)
 
+    def get_pending_appointment_models(self) -> List[Appointment]:
+        """Bekleyen randevuları Appointment nesneleri olarak döner (değişmeyen satırlar önbellekten gelir)."""
+        return [_cached_appointment(app_data) for app_data in self.get_pending_appointments()]
+
     def get_pending_for_dentist(self, dentist_id: int) -> List[Dict[str, Any]]:
         return self.adapter.list_appointments_by_dentist(dentist_id, status=Appointment.STATUS_PENDING)
\ No newline at end of file
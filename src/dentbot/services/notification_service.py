@@ -2,41 +2,222 @@ from __future__ import annotations
 
 import logging
 import asyncio
-import re
-from typing import Dict, Any, Optional, Awaitable
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache, partial
+from typing import Dict, Any, List, Optional, Awaitable, Tuple
 
 try:
     from telegram import Bot, InlineKeyboardMarkup, InlineKeyboardButton
+    from telegram.error import RetryAfter
 except ImportError:
     Bot = Any
     InlineKeyboardMarkup = Any
     InlineKeyboardButton = Any
+
+    class RetryAfter(Exception):
+        retry_after: float = 0.0
+
+# python-telegram-bot yoksa (ör. testler) onay butonları olmadan gönderilir
+_HAS_TELEGRAM = InlineKeyboardMarkup is not Any
+
+# Doktor onay mesajındaki buton etiketleri
+_APPROVE_LABEL = "✅ ONAYLA"
+_REJECT_LABEL = "❌ REDDET"
     
 
+# MarkdownV2 kaçırma, modelle aynı str.translate tablosunu kullanır (regex yerine tek C döngüsü)
+from dentbot.models.appointment import Appointment, escape_markdown_v2
+
 logger = logging.getLogger(__name__)
 
-def escape_markdown_v2(text: str) -> str:
-    """MarkdownV2 için özel karakterleri güvenli hale getirir."""
-    # Kaçırılması gereken karakterler listesi
-    escape_chars = r'_*[]()~`>#+-=|{}.!'
-    return re.sub(f'([{re.escape(escape_chars)}])', r'\\\1', str(text))
+# --- Mesaj şablonları (MarkdownV2; alanlar önceden kaçırılmış olarak % ile doldurulur) ---
+_DETAILS_TMPL = (
+    "• *Hasta:* %(patient_name)s\n"
+    "• *Telefon:* %(patient_phone)s\n"
+    "• *Tarih:* %(appointment_date)s\n"
+    "• *Saat:* %(time_slot)s\n"
+    "• *Tedavi:* %(treatment_type)s\n"
+    "• *Durum:* %(status)s"
+)
+
+_CONFIRMATION_TMPL = (
+    "✅ *Randevu Talebiniz Alındı*\n\n"
+    "Referans Kodunuz: *%(ref)s*\n\n"
+    "*Randevu Detayları:*\n"
+    "%(details)s\n\n"
+    "Talebiniz doktor onayına sunulmuştur\\. Onaylandığında sizi anlık olarak bilgilendireceğiz\\."
+)
+
+_APPROVAL_REQUEST_TMPL = (
+    "🔔 *YENİ RANDEVU TALEBİ*\n\n"
+    "Kayıt Kodu: *%(ref)s*\n\n"
+    "*Hasta Bilgileri:*\n"
+    "%(details)s\n\n"
+    "Lütfen aşağıdaki butonları kullanarak işlemi onaylayın veya reddedin\\."
+)
+
+_DIGEST_TMPL = (
+    "🔔 *%(count)d YENİ RANDEVU TALEBİ*\n\n"
+    "%(items)s\n\n"
+    "Lütfen her randevu için kendi satırındaki butonları kullanın\\."
+)
+
+_DIGEST_ITEM_TMPL = (
+    "• *%(ref)s* \\- %(appointment_date)s, %(time_slot)s\n"
+    "  %(patient_name)s \\(%(treatment_type)s\\)"
+)
+
+_APPROVED_TMPL = (
+    "🎉 *Randevunuz ONAYLANDI*\n\n"
+    "Doktorumuz talebinizi onayladı, kliniğimizde sizi bekliyor olacağız\\.\n\n"
+    "*Onaylanan Randevu Bilgileri:*\n"
+    "%(details)s\n\n"
+    "Herhangi bir sorunuz olursa buradan bize ulaşabilirsiniz\\."
+)
+
+_REJECTED_TMPL = (
+    "❌ *Randevu Talebi Onaylanamadı*\n\n"
+    "Üzgünüz, seçtiğiniz saat dilimi doktorumuz tarafından uygun bulunamadı\\.\n\n"
+    "*İptal Edilen Detaylar:*\n"
+    "%(details)s\n\n"
+    "Lütfen asistanımızla konuşarak farklı bir zaman dilimi belirleyin\\."
+)
+
+_REMINDER_TMPL = (
+    "⏰ *Randevu Hatırlatması*\n\n"
+    "Yarın, saat *%(time_slot)s*'da *%(treatment_type)s* için randevunuz bulunmaktadır\\.\n\n"
+    "Lütfen randevunuza zamanında gelmeye özen gösterin\\. Sağlıklı günler dileriz\\."
+)
+
+_CANCELLATION_TMPL = (
+    "🗑️ *Randevu İptal Edildi*\n\n"
+    "*%(ref)s* kodlu randevunuz başarıyla iptal edilmiştir\\.\n\n"
+    "*İptal Edilen Detaylar:*\n"
+    "%(details)s"
+)
+
+# Telegram 429 (RetryAfter) yanıtında aynı mesaj için en fazla bu kadar yeniden deneme yapılır
+SEND_MAX_RETRIES = 3
+# Toplu gönderimlerde aynı anda bekleyen en fazla istek (Telegram genel sınırı ~30 mesaj/sn)
+BULK_SEND_CONCURRENCY = 30
+# Bot başına saniyedeki en fazla gönderim (Telegram genel sınırının biraz altında; 429 almadan)
+SEND_MAX_PER_SECOND = 28
+
+
+# Bot'un kendi event loop'u bilinmediğinde (servis loop dışında kurulduysa) gönderimler
+# bu tek, uzun ömürlü arka plan loop'una verilir; çağrı başına loop kurulup yıkılmaz.
+_BG_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_BG_LOOP_LOCK = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _BG_LOOP
+    if _BG_LOOP is None:
+        with _BG_LOOP_LOCK:
+            if _BG_LOOP is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="dentbot-notifications", daemon=True).start()
+                _BG_LOOP = loop
+    return _BG_LOOP
+
+
+def _template_data(appointment: Appointment) -> Dict[str, str]:
+    """Şablonlara verilecek, MarkdownV2 için kaçırılmış alanlar (Appointment'ın önbellekli *_mdv2 alanlarından)."""
+    return {
+        'ref': appointment.ref_code_mdv2,
+        'patient_name': appointment.patient_name_mdv2,
+        'patient_phone': escape_markdown_v2(appointment.patient_phone),
+        'appointment_date': appointment.appointment_date_mdv2,
+        'time_slot': appointment.time_slot_mdv2,
+        'treatment_type': appointment.treatment_type_mdv2,
+        'status': escape_markdown_v2(appointment.status.upper()),
+    }
 
-def _run_async(coro: Awaitable) -> Any:
+
+@lru_cache(maxsize=512)
+def _format_details_cached(patient_name: str, patient_phone: str, appointment_date: str,
+                           time_slot: str, treatment_type: str, status: str) -> str:
+    """Ham alanlardan kaçırılmış detay bloğu; aynı randevu (ve durum) için tekrar hesaplanmaz."""
+    esc = escape_markdown_v2
+    return _DETAILS_TMPL % {
+        'patient_name': esc(patient_name),
+        'patient_phone': esc(patient_phone),
+        'appointment_date': esc(appointment_date),
+        'time_slot': esc(time_slot),
+        'treatment_type': esc(treatment_type),
+        'status': esc(status.upper()),
+    }
+
+
+def _format_appointment_details(appointment: Appointment) -> str:
+    """Detayları madde işaretli ve okunaklı formatlar."""
+    return _format_details_cached(
+        appointment.patient_name,
+        appointment.patient_phone,
+        appointment.appointment_date,
+        appointment.time_slot,
+        appointment.treatment_type,
+        appointment.status,
+    )
+
+
+def _render(template: str, appointment: Appointment) -> str:
+    """Mesaj şablonunu tek bir C seviyesinde % biçimlendirmesiyle doldurur."""
+    return template % {'ref': appointment.ref_code_mdv2, 'details': _format_appointment_details(appointment)}
+
+
+def _reminder_text(appointment: Appointment) -> str:
+    """Hatırlatma mesajını (yalnızca saat ve tedavi ile) hazırlar."""
+    return _REMINDER_TMPL % {
+        'time_slot': appointment.time_slot_mdv2,
+        'treatment_type': appointment.treatment_type_mdv2 or 'randevu',
+    }
+
+
+class _SendRateLimiter:
     """
-    SYNC thread'den ASYNC coroutine'i güvenle çalıştırır.
-    Event loop çakışmalarını ve RuntimeError hatalarını önler.
+    Gönderimleri 1/rate aralıklarla sıraya dizen sızdıran kova. Her çağrı kendine bir zaman
+    dilimi ayırır ve beklemesi gereken süreyi döner; thread kilidiyle çalıştığı için hem
+    bot'un loop'undan hem arka plan loop'undan gelen gönderimler aynı sınırı paylaşır.
     """
-    try:
-        # Zaten çalışan bir döngü var mı kontrol et
-        loop = asyncio.get_running_loop()
-        if loop.is_running():
-            # Eğer döngü çalışıyorsa, işi o döngüye güvenli bir şekilde gönder
-            future = asyncio.run_coroutine_threadsafe(coro, loop)
-            return future.result(timeout=15)
-        return asyncio.run(coro)
-    except RuntimeError:
-        # Loop yoksa yeni bir tane başlat
-        return asyncio.run(coro)
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self._interval
+        return slot - now
+
+
+# Telegram sınırları bot (token) başınadır: aynı token'ı kullanan tüm servisler tek sınırlayıcıyı paylaşır
+_LIMITERS: Dict[Any, _SendRateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def _limiter_for(bot: Any) -> _SendRateLimiter:
+    """Bot'un token'ına ait paylaşılan sınırlayıcı (token yoksa bot nesnesinin kendisine göre)."""
+    key = getattr(bot, "token", None) or id(bot)
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(key)
+        if limiter is None:
+            limiter = _LIMITERS[key] = _SendRateLimiter(SEND_MAX_PER_SECOND)
+        return limiter
+
+
+def _log_failure(label: str, future: Future) -> None:
+    """Arka planda tamamlanan gönderimin hatasını loglar (fire-and-forget)."""
+    if future.cancelled():
+        return
+    exc = future.exception()
+    if exc is not None:
+        logger.error("%s: %s", label, exc)
 
 
 class NotificationService:
@@ -47,130 +228,167 @@ class NotificationService:
     
     def __init__(self, telegram_bot: Bot):
         self.bot = telegram_bot
+        # main.py servisi bot'ların loop'u içinde kurar; gönderimler o loop'a planlanır
+        # (Bot'un HTTP istemcisi o loop'a bağlıdır).
+        try:
+            self._loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        self._limiter = _limiter_for(telegram_bot)
 
-    def _format_appointment_details(self, data: Dict[str, Any]) -> str:
-        """Detayları madde işaretli ve okunaklı formatlar."""
-        # Verileri güvenli hale getir ve kaçır
-        name = escape_markdown_v2(data.get('patient_name', 'Bilinmiyor'))
-        phone = escape_markdown_v2(data.get('patient_phone', 'N/A'))
-        date = escape_markdown_v2(data.get('appointment_date', 'N/A'))
-        slot = escape_markdown_v2(data.get('time_slot', 'N/A'))
-        treat = escape_markdown_v2(data.get('treatment_type', 'N/A'))
-        status = escape_markdown_v2(data.get('status', 'pending').upper())
-
-        return (
-            f"• *Hasta:* {name}\n"
-            f"• *Telefon:* {phone}\n"
-            f"• *Tarih:* {date}\n"
-            f"• *Saat:* {slot}\n"
-            f"• *Tedavi:* {treat}\n"
-            f"• *Durum:* {status}"
-        )
-
-    def send_appointment_confirmation(self, data: Dict[str, Any], chat_id: int) -> None:
+    async def _send(self, **kwargs: Any) -> Any:
+        """
+        send_message'ı Telegram'ın flood limitine uyarak gönderir: istekler SEND_MAX_PER_SECOND ile
+        sınırlanır, yine de RetryAfter (429) alınırsa istenen süre beklenip tekrar denenir.
+        Bekleme arka planda olduğu için çağıranı bloklamaz.
+        """
+        # Mesaj gövdesi yalnızca DEBUG'da loglanır; INFO satırları chat_id ve bildirim türüyle yetinir
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Bildirim gövdesi (Chat ID: %s): %s", kwargs.get('chat_id'), kwargs.get('text'))
+        for attempt in range(SEND_MAX_RETRIES + 1):
+            wait = self._limiter.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                return await self.bot.send_message(**kwargs)
+            except RetryAfter as e:
+                if attempt == SEND_MAX_RETRIES:
+                    raise
+                delay = e.retry_after
+                delay = delay.total_seconds() if hasattr(delay, "total_seconds") else float(delay)
+                logger.warning("Telegram hız limiti (chat_id=%s); %.0f sn sonra tekrar denenecek.", kwargs.get('chat_id'), delay)
+                await asyncio.sleep(delay)
+
+    def _submit(self, coro: Awaitable, error_label: str) -> Future:
+        """
+        Coroutine'i bekleme yapmadan planlar; hem loop thread'inden hem de worker
+        thread'lerinden güvenle çağrılabilir. Hatalar tamamlanınca loglanır.
+        """
+        loop = self._loop if self._loop is not None and self._loop.is_running() else _background_loop()
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        future.add_done_callback(partial(_log_failure, error_label))
+        return future
+
+    # --- Asenkron gönderimler: event loop'taki çağıranlar doğrudan await eder ---
+
+    async def send_appointment_confirmation_async(self, appointment: Appointment, chat_id: int) -> Any:
         """Hasta için: Randevu talebi oluşturuldu bildirimi."""
-        logger.info(f"Hastaya randevu onay talebi gönderiliyor (Chat ID: {chat_id})")
-        ref = escape_markdown_v2(f"APT-{data.get('id', '...')}")
-        
-        message = (
-            f"✅ *Randevu Talebiniz Alındı*\n\n"
-            f"Referans Kodunuz: *{ref}*\n\n"
-            f"*Randevu Detayları:*\n"
-            f"{self._format_appointment_details(data)}\n\n"
-            f"Talebiniz doktor onayına sunulmuştur\. Onaylandığında sizi anlık olarak bilgilendireceğiz\."
-        )
-        
-        try:
-            _run_async(self.bot.send_message(chat_id=chat_id, text=message, parse_mode='MarkdownV2'))
-        except Exception as e:
-            logger.error(f"Onay talebi gönderilirken hata: {e}")
+        logger.info("Hastaya randevu onay talebi gönderiliyor (Chat ID: %s)", chat_id)
+        message = _render(_CONFIRMATION_TMPL, appointment)
+        return await self._send(chat_id=chat_id, text=message, parse_mode='MarkdownV2')
 
-    def send_approval_request(self, data: Dict[str, Any], chat_id: int) -> None:
+    async def send_approval_request_async(self, appointment: Appointment, chat_id: int) -> Any:
         """Doktor için: Yeni onay talebi ve işlem butonları."""
-        logger.info(f"Doktora onay isteği gönderiliyor (Chat ID: {chat_id})")
-        ref = escape_markdown_v2(f"APT-{data.get('id', '...')}")
-        app_id = data.get('id', 0)
-        
-        message = (
-            f"🔔 *YENİ RANDEVU TALEBİ*\n\n"
-            f"Kayıt Kodu: *{ref}*\n\n"
-            f"*Hasta Bilgileri:*\n"
-            f"{self._format_appointment_details(data)}\n\n"
-            f"Lütfen aşağıdaki butonları kullanarak işlemi onaylayın veya reddedin\."
-        )
-        
-        keyboard = InlineKeyboardMarkup([[
-            InlineKeyboardButton("✅ ONAYLA", callback_data=f"APPROVE_{app_id}"),
-            InlineKeyboardButton("❌ REDDET", callback_data=f"REJECT_{app_id}")
-        ]])
+        logger.info("Doktora onay isteği gönderiliyor (Chat ID: %s)", chat_id)
+        app_id = appointment.id or 0
+        message = _render(_APPROVAL_REQUEST_TMPL, appointment)
+
+        keyboard = None
+        if _HAS_TELEGRAM:
+            button = InlineKeyboardButton
+            keyboard = InlineKeyboardMarkup([[
+                button(_APPROVE_LABEL, callback_data=f"APPROVE_{app_id}"),
+                button(_REJECT_LABEL, callback_data=f"REJECT_{app_id}")
+            ]])
         
-        try:
-            _run_async(self.bot.send_message(chat_id=chat_id, text=message, reply_markup=keyboard, parse_mode='MarkdownV2'))
-        except Exception as e:
-            logger.error(f"Doktor bildirim hatası: {e}")
+        return await self._send(chat_id=chat_id, text=message, reply_markup=keyboard, parse_mode='MarkdownV2')
+
+    async def send_approval_digest_async(self, appointments: List[Appointment], chat_id: int) -> Any:
+        """Doktor için: Birden çok onay talebi tek mesajda, her randevuya bir buton satırıyla."""
+        logger.info("Doktora %d randevuluk onay özeti gönderiliyor (Chat ID: %s)", len(appointments), chat_id)
+        message = _DIGEST_TMPL % {
+            'count': len(appointments),
+            'items': "\n".join(_DIGEST_ITEM_TMPL % _template_data(appointment) for appointment in appointments),
+        }
+
+        keyboard = None
+        if _HAS_TELEGRAM:
+            button = InlineKeyboardButton
+            keyboard = InlineKeyboardMarkup([
+                [
+                    button(f"{_APPROVE_LABEL} {appointment.ref_code}", callback_data=f"APPROVE_{appointment.id}"),
+                    button(f"{_REJECT_LABEL} {appointment.ref_code}", callback_data=f"REJECT_{appointment.id}"),
+                ]
+                for appointment in appointments
+            ])
 
-    def send_approval_notification(self, data: Dict[str, Any], patient_chat_id: int) -> None:
+        return await self._send(chat_id=chat_id, text=message, reply_markup=keyboard, parse_mode='MarkdownV2')
+
+    async def send_approval_notification_async(self, appointment: Appointment, patient_chat_id: int) -> Any:
         """Hasta için: Randevu onaylandı bildirimi."""
-        logger.info(f"Hastaya onay bildirimi gönderiliyor (Chat ID: {patient_chat_id})")
-        message = (
-            f"🎉 *Randevunuz ONAYLANDI*\n\n"
-            f"Doktorumuz talebinizi onayladı, kliniğimizde sizi bekliyor olacağız\.\n\n"
-            f"*Onaylanan Randevu Bilgileri:*\n"
-            f"{self._format_appointment_details(data)}\n\n"
-            f"Herhangi bir sorunuz olursa buradan bize ulaşabilirsiniz\."
-        )
-        
-        try:
-            _run_async(self.bot.send_message(chat_id=patient_chat_id, text=message, parse_mode='MarkdownV2'))
-        except Exception as e:
-            logger.error(f"Onay bildirimi hatası: {e}")
+        logger.info("Hastaya onay bildirimi gönderiliyor (Chat ID: %s)", patient_chat_id)
+        message = _render(_APPROVED_TMPL, appointment)
+        return await self._send(chat_id=patient_chat_id, text=message, parse_mode='MarkdownV2')
 
-    def send_rejection_notification(self, data: Dict[str, Any], patient_chat_id: int) -> None:
+    async def send_rejection_notification_async(self, appointment: Appointment, patient_chat_id: int) -> Any:
         """Hasta için: Randevu reddedildi bildirimi."""
-        logger.info(f"Hastaya red bildirimi gönderiliyor (Chat ID: {patient_chat_id})")
-        message = (
-            f"❌ *Randevu Talebi Onaylanamadı*\n\n"
-            f"Üzgünüz, seçtiğiniz saat dilimi doktorumuz tarafından uygun bulunamadı\.\n\n"
-            f"*İptal Edilen Detaylar:*\n"
-            f"{self._format_appointment_details(data)}\n\n"
-            f"Lütfen asistanımızla konuşarak farklı bir zaman dilimi belirleyin\."
-        )
-        
-        try:
-            _run_async(self.bot.send_message(chat_id=patient_chat_id, text=message, parse_mode='MarkdownV2'))
-        except Exception as e:
-            logger.error(f"Red bildirimi hatası: {e}")
+        logger.info("Hastaya red bildirimi gönderiliyor (Chat ID: %s)", patient_chat_id)
+        message = _render(_REJECTED_TMPL, appointment)
+        return await self._send(chat_id=patient_chat_id, text=message, parse_mode='MarkdownV2')
 
-    def send_reminder(self, data: Dict[str, Any], patient_chat_id: int) -> None:
+    async def send_reminder_async(self, appointment: Appointment, patient_chat_id: int) -> Any:
         """Hasta için: Randevu hatırlatması."""
-        logger.info(f"Hastaya hatırlatma gönderiliyor (Chat ID: {patient_chat_id})")
-        slot = escape_markdown_v2(data.get('time_slot', 'N/A'))
-        treat = escape_markdown_v2(data.get('treatment_type', 'randevu'))
-        
-        message = (
-            f"⏰ *Randevu Hatırlatması*\n\n"
-            f"Yarın, saat *{slot}*'da *{treat}* için randevunuz bulunmaktadır\.\n\n"
-            f"Lütfen randevunuza zamanında gelmeye özen gösterin\. Sağlıklı günler dileriz\."
-        )
-        
-        try:
-            _run_async(self.bot.send_message(chat_id=patient_chat_id, text=message, parse_mode='MarkdownV2'))
-        except Exception as e:
-            logger.error(f"Hatırlatma gönderim hatası: {e}")
+        logger.info("Hastaya hatırlatma gönderiliyor (Chat ID: %s)", patient_chat_id)
+        message = _reminder_text(appointment)
+        return await self._send(chat_id=patient_chat_id, text=message, parse_mode='MarkdownV2')
+
+    async def send_many(self, messages: List[Dict[str, Any]]) -> List[Any]:
+        """
+        send_message argümanlarından (chat_id, text, ...) oluşan mesajları eşzamanlı gönderir.
+        Aynı anda en fazla BULK_SEND_CONCURRENCY istek uçuşta olur; hatalar mesaj başına loglanır
+        ve sonuç listesinde istisna olarak döner (biri diğerlerini durdurmaz).
+        """
+        semaphore = asyncio.Semaphore(BULK_SEND_CONCURRENCY)
+
+        async def send_one(kwargs: Dict[str, Any]) -> Any:
+            async with semaphore:
+                return await self._send(**kwargs)
+
+        results = await asyncio.gather(*(send_one(kwargs) for kwargs in messages), return_exceptions=True)
+        for kwargs, result in zip(messages, results):
+            if isinstance(result, Exception):
+                logger.error("Bildirim gönderim hatası (Chat ID: %s): %s", kwargs.get('chat_id'), result)
+        return results
 
-    def send_cancellation(self, data: Dict[str, Any], patient_chat_id: int) -> None:
+    async def send_reminders_bulk_async(self, items: List[Tuple[Appointment, int]]) -> List[Any]:
+        """
+        Hatırlatmaları (randevu, hasta chat_id) çiftleri için tek seferde, eşzamanlı gönderir.
+        Aynı anda en fazla BULK_SEND_CONCURRENCY istek uçuşta olur (Telegram ~30 mesaj/sn sınırı).
+        """
+        logger.info("%d hastaya toplu hatırlatma gönderiliyor", len(items))
+        return await self.send_many([
+            {'chat_id': chat_id, 'text': _reminder_text(appointment), 'parse_mode': 'MarkdownV2'}
+            for appointment, chat_id in items
+        ])
+
+    async def send_cancellation_async(self, appointment: Appointment, patient_chat_id: int) -> Any:
         """Hasta için: Randevu iptal edildi teyidi."""
-        logger.info(f"Hastaya iptal teyidi gönderiliyor (Chat ID: {patient_chat_id})")
-        ref = escape_markdown_v2(f"APT-{data.get('id', '...')}")
-        
-        message = (
-            f"🗑️ *Randevu İptal Edildi*\n\n"
-            f"*{ref}* kodlu randevunuz başarıyla iptal edilmiştir\.\n\n"
-            f"*İptal Edilen Detaylar:*\n"
-            f"{self._format_appointment_details(data)}"
-        )
-        
-        try:
-            _run_async(self.bot.send_message(chat_id=patient_chat_id, text=message, parse_mode='MarkdownV2'))
-        except Exception as e:
-            logger.error(f"İptal teyidi gönderim hatası: {e}")
\ No newline at end of file
+        logger.info("Hastaya iptal teyidi gönderiliyor (Chat ID: %s)", patient_chat_id)
+        message = _render(_CANCELLATION_TMPL, appointment)
+        return await self._send(chat_id=patient_chat_id, text=message, parse_mode='MarkdownV2')
+
+    # --- Senkron arayüz (ApprovalService, araçlar): asenkron karşılığını beklemeden planlar ---
+
+    def send_appointment_confirmation(self, appointment: Appointment, chat_id: int) -> Future:
+        return self._submit(self.send_appointment_confirmation_async(appointment, chat_id), "Onay talebi gönderilirken hata")
+
+    def send_approval_request(self, appointment: Appointment, chat_id: int) -> Future:
+        return self._submit(self.send_approval_request_async(appointment, chat_id), "Doktor bildirim hatası")
+
+    def send_approval_digest(self, appointments: List[Appointment], chat_id: int) -> Future:
+        return self._submit(self.send_approval_digest_async(appointments, chat_id), "Doktor özet bildirimi hatası")
+
+    def send_approval_notification(self, appointment: Appointment, patient_chat_id: int) -> Future:
+        return self._submit(self.send_approval_notification_async(appointment, patient_chat_id), "Onay bildirimi hatası")
+
+    def send_rejection_notification(self, appointment: Appointment, patient_chat_id: int) -> Future:
+        return self._submit(self.send_rejection_notification_async(appointment, patient_chat_id), "Red bildirimi hatası")
+
+    def send_reminder(self, appointment: Appointment, patient_chat_id: int) -> Future:
+        return self._submit(self.send_reminder_async(appointment, patient_chat_id), "Hatırlatma gönderim hatası")
+
+    def send_reminders_bulk(self, items: List[Tuple[Appointment, int]]) -> Future:
+        return self._submit(self.send_reminders_bulk_async(items), "Toplu hatırlatma gönderim hatası")
+
+    def send_cancellation(self, appointment: Appointment, patient_chat_id: int) -> Future:
+        return self._submit(self.send_cancellation_async(appointment, patient_chat_id), "İptal teyidi gönderim hatası")
@@ -170,15 +170,16 @@ def cancel_appointment(appointment_id: Any) -> str:
     success = adapter.delete_appointment(app_id)
     
     if success:
+        appointment = Appointment.from_dict(appointment_data)
         # Hastaya iptal bildirimi gönder (DB'deki chat_id kullanılır)
-        patient_chat_id = appointment_data.get('patient_chat_id')
+        patient_chat_id = appointment.patient_chat_id
         if patient_chat_id:
              # ⭐ Global ApprovalService'in patient_notif'ini kullan
              get_approval_service().patient_notif.send_cancellation(
-                 appointment_data, patient_chat_id
+                 appointment, patient_chat_id
              )
         
-        return f"✅ Randevu **{Appointment.from_dict(appointment_data).get_reference_code()}** başarıyla iptal edilmiştir."
+        return f"✅ Randevu **{appointment.get_reference_code()}** başarıyla iptal edilmiştir."
     else:
         return f"❌ Hata: Randevu {app_id} iptal edilemedi."
 
@@ -1,10 +1,66 @@
 import os
 import sys
 
+import pytest
+
 # Add the project src directory to PYTHONPATH for tests
 CURRENT_DIR = os.path.dirname(__file__)
 SRC_PATH = os.path.abspath(os.path.join(CURRENT_DIR, "..", "src"))
 if SRC_PATH not in sys.path:
     sys.path.insert(0, SRC_PATH)
 
+from dentbot.adapters.sqlite_adapter import SQLiteAppointmentAdapter  # noqa: E402
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'dentbot_test.db'}"
+
+
+@pytest.fixture
+def db(db_url):
+    adapter = SQLiteAppointmentAdapter(db_url)
+    adapter.init()
+    yield adapter
+    # Windows'ta dosyanın silinebilmesi için tüm thread bağlantıları kapatılır
+    adapter.close()
+
+
+@pytest.fixture
+def make_dentist(db):
+    def make(**overrides):
+        data = {
+            "full_name": "Ayşe Yılmaz",
+            "specialty": "Ortodonti",
+            "working_days": "Monday,Tuesday",
+            "start_time": "09:00",
+            "end_time": "18:00",
+        }
+        data.update(overrides)
+        return db.create_dentist(data)
+    return make
+
+
+@pytest.fixture
+def appointment_data():
+    def make(dentist_id, **overrides):
+        data = {
+            "dentist_id": dentist_id,
+            "patient_name": "Test Hasta",
+            "patient_phone": "05551234567",
+            "patient_email": "hasta@example.com",
+            "appointment_date": "2025-11-20",
+            "time_slot": "10:00",
+            "treatment_type": "Dolgu",
+            "duration_minutes": 30,
+        }
+        data.update(overrides)
+        return data
+    return make
+
 
+@pytest.fixture
+def make_appointment(db, appointment_data):
+    def make(dentist_id, **overrides):
+        return db.create_appointment(appointment_data(dentist_id, **overrides))
+    return make
@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+from dentbot.models import Appointment
+from dentbot.services import approval_service
+from dentbot.services.approval_service import ApprovalService, _APPT_CACHE
+
+class SilentNotifications:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def test_pending_models_are_reused_until_state_changes(db, make_dentist, make_appointment):
+    dentist = make_dentist()
+    app = make_appointment(dentist["id"])
+    service = ApprovalService(db, SilentNotifications(), SilentNotifications())
+
+    first = service.get_pending_appointment_models()
+    assert service.get_pending_appointment_models()[0] is first[0]
+
+    db.update_appointment(app["id"], {"time_slot": "14:00"})
+    updated = service.get_pending_appointment_models()[0]
+    assert updated is not first[0] and updated.time_slot == "14:00"
+
+    service.approve_appointment(app["id"])
+    assert app["id"] not in _APPT_CACHE
+    assert service.get_pending_appointment_models() == []
+
+
+def test_cached_models_keep_escaped_fields(db, make_dentist, make_appointment):
+    dentist = make_dentist()
+    make_appointment(dentist["id"], patient_name="Ali (Test)")
+    service = ApprovalService(db, SilentNotifications(), SilentNotifications())
+
+    (app,) = service.get_pending_appointment_models()
+    assert app.patient_name_mdv2 == "Ali \\(Test\\)"
+    assert app.appointment_date_mdv2 == "2025\\-11\\-20"
+    assert "patient_name_mdv2" not in app.to_dict()
+    assert service.get_pending_appointment_models()[0].__dict__["patient_name_mdv2"] == "Ali \\(Test\\)"
+
+
+def test_dentist_chat_id_is_cached_until_reregistered(db, make_dentist):
+    dentist = make_dentist()
+    service = ApprovalService(db, SilentNotifications(), SilentNotifications())
+
+    # Kayıtsız doktor önbelleğe alınmaz; kayıt sonrası hemen bulunur
+    assert service._get_dentist_chat_id(dentist["id"]) == -1
+    service.register_dentist_chat_id(dentist["id"], 111)
+    assert service._get_dentist_chat_id(dentist["id"]) == 111
+
+    db.update_dentist_chat_id(dentist["id"], 222)
+    assert service._get_dentist_chat_id(dentist["id"]) == 111
+    service.register_dentist_chat_id(dentist["id"], 333)
+    assert service._get_dentist_chat_id(dentist["id"]) == 333
+
+
+class RecordingNotifications:
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args))
+
+
+def test_notifications_receive_appointment_models(db, make_dentist, appointment_data):
+    dentist = make_dentist()
+    db.update_dentist_chat_id(dentist["id"], 111)
+    patient, doctor = RecordingNotifications(), RecordingNotifications()
+    service = ApprovalService(db, patient, doctor)
+
+    created = service.create_pending_appointment(
+        appointment_data(dentist["id"], patient_chat_id=42)
+    )
+
+    ((name, (sent, chat_id)),) = patient.calls
+    assert name == "send_appointment_confirmation" and chat_id == 42
+    assert isinstance(sent, Appointment) and sent.id == created["id"]
+
+    # İlk onay talebi özet penceresini beklemeden doktora gider
+    ((name, (sent_to_doctor, chat_id)),) = doctor.calls
+    assert name == "send_approval_request" and chat_id == 111
+    assert sent_to_doctor is sent
+    service.flush_pending_digests()
+    assert len(doctor.calls) == 1
+
+
+def test_approval_requests_are_coalesced_per_dentist(db, make_dentist, appointment_data):
+    dentist = make_dentist()
+    db.update_dentist_chat_id(dentist["id"], 111)
+    doctor = RecordingNotifications()
+    service = ApprovalService(db, SilentNotifications(), doctor)
+
+    created = [
+        service.create_pending_appointment(appointment_data(dentist["id"], time_slot=slot))
+        for slot in ("10:00", "11:00", "12:00")
+    ]
+    service._flush_digest(dentist["id"])
+    service._flush_digest(dentist["id"])
+
+    # İlki hemen, pencere içinde gelenler tek özet olarak gönderilir
+    (first, digest) = doctor.calls
+    assert first[0] == "send_approval_request" and first[1][0].id == created[0]["id"]
+    name, (appointments, chat_id) = digest
+    assert name == "send_approval_digest" and chat_id == 111
+    assert [a.id for a in appointments] == [c["id"] for c in created[1:]]
+
+    # Pencere kapandıktan sonraki talep yine beklemeden gider
+    service.create_pending_appointment(appointment_data(dentist["id"], time_slot="13:00"))
+    assert doctor.calls[-1][0] == "send_approval_request"
+    service.flush_pending_digests()
+
+
+def test_approval_and_rejection_notify_state_listeners(db, make_dentist, make_appointment):
+    dentist = make_dentist()
+    first = make_appointment(dentist["id"])
+    second = make_appointment(dentist["id"], time_slot="11:00")
+    service = ApprovalService(db, SilentNotifications(), SilentNotifications())
+    changes = []
+    service.add_state_listener(lambda: changes.append("changed"))
+
+    service.approve_appointment(first["id"])
+    service.reject_appointment(second["id"])
+    assert changes == ["changed", "changed"]
+
+
+@pytest.mark.asyncio
+async def test_digest_window_uses_the_event_loop_and_flushes_on_shutdown(
+    db, make_dentist, appointment_data, monkeypatch
+):
+    monkeypatch.setattr(approval_service, "APPROVAL_DIGEST_DELAY", 0.05)
+    dentist = make_dentist()
+    db.update_dentist_chat_id(dentist["id"], 111)
+    doctor = RecordingNotifications()
+    service = ApprovalService(db, SilentNotifications(), doctor)
+
+    # Talepler araçlardan (worker thread) gelir
+    for slot in ("10:00", "11:00"):
+        await asyncio.to_thread(
+            service.create_pending_appointment, appointment_data(dentist["id"], time_slot=slot)
+        )
+    await asyncio.sleep(0)
+    assert isinstance(service._digest_timers[dentist["id"]], asyncio.TimerHandle)
+
+    await asyncio.sleep(0.1)
+    assert [name for name, _ in doctor.calls] == ["send_approval_request", "send_approval_request"]
+    assert service._pending_digest == {}
+
+    # Kapanışta açık pencerede bekleyen talepler kaybolmaz
+    for slot in ("12:00", "13:00", "14:00"):
+        service.create_pending_appointment(appointment_data(dentist["id"], time_slot=slot))
+    service.flush_pending_digests()
+    assert [name for name, _ in doctor.calls][-2:] == ["send_approval_request", "send_approval_digest"]
+    await asyncio.sleep(0)
+    assert dentist["id"] not in service._digest_timers
@@ -0,0 +1,20 @@
+from dentbot.base_config import DentBotConfig
+
+
+class StubConfig(DentBotConfig):
+    def get_database_url(self): return "sqlite:///:memory:"
+    def get_groq_api_key(self): return None
+    def get_groq_model(self): return "test-model"
+    def get_llm_timeout(self): return 30
+    def get_telegram_bot_token(self): return None
+    def get_dentist_telegram_token(self): return None
+    def create_adapter(self): raise NotImplementedError
+
+
+def test_system_prompt_is_time_invariant():
+    config = StubConfig()
+    first = config.get_system_prompt()
+    assert hash(first) == hash(config.get_system_prompt())
+    # Zaman bilgisi prompt'ta değil, dinamik bağlamda olmalı
+    assert "CURRENT DATE:" not in first
+    assert "CURRENT DATE:" in config.get_dynamic_context()
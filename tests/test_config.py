@@ -0,0 +1,42 @@
+import pytest
+
+from dentbot.config import DemoSeededDentBotConfig, EnvironmentDentBotConfig
+
+
+def test_environment_config_snapshots_env(monkeypatch):
+    monkeypatch.setenv("CLINIC_WORKING_HOURS", "Pazartesi: 09:00-18:00, Cuma: 10:00-16:00")
+    monkeypatch.setenv("LLM_TIMEOUT", "abc")
+    config = EnvironmentDentBotConfig()
+
+    hours = config.get_clinic_working_hours()
+    assert dict(hours) == {"Pazartesi": "09:00-18:00", "Cuma": "10:00-16:00"}
+    assert config.get_llm_timeout() == 60
+    with pytest.raises(TypeError):
+        hours["Salı"] = "09:00-12:00"
+
+    # Değerler kurulumda okunur; sonradan yapılan env değişiklikleri yansımaz
+    monkeypatch.setenv("CLINIC_NAME", "Yeni Klinik")
+    assert config.get_clinic_display_name() != "Yeni Klinik"
+
+
+def test_demo_config_seeds_once(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'demo.db'}")
+    config = DemoSeededDentBotConfig()
+
+    adapter = config.create_adapter()
+    treatments = len(adapter.list_treatments())
+    assert treatments > 0 and adapter.list_dentists()
+
+    # İkinci kurulumda veriler tekrar eklenmez
+    adapter = config.create_adapter()
+    assert len(adapter.list_treatments()) == treatments
+
+
+def test_environment_system_prompt_override_is_cached(monkeypatch):
+    monkeypatch.setenv("DENTBOT_SYSTEM_PROMPT", "Özel prompt")
+    config = EnvironmentDentBotConfig()
+    assert config.get_system_prompt() == "Özel prompt"
+    assert config.get_system_prompt() is config.get_system_prompt()
+
+    config.invalidate_system_prompt()
+    assert config.get_system_prompt() == "Özel prompt"
@@ -0,0 +1,57 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from dentbot.channels import dentist_panel
+
+
+def test_message_cache_is_bounded_lru(monkeypatch):
+    monkeypatch.setattr(dentist_panel, "MSG_MD_CACHE_SIZE", 2)
+    context = SimpleNamespace(bot_data={})
+
+    dentist_panel._remember_message(context, 1, "bir")
+    dentist_panel._remember_message(context, 2, "iki")
+    dentist_panel._remember_message(context, 1, "bir")
+    dentist_panel._remember_message(context, 3, "üç")
+
+    assert list(context.bot_data["msg_md_cache"]) == [1, 3]
+
+
+@pytest.mark.asyncio
+async def test_clicks_on_a_busy_digest_ask_to_retry():
+    release = asyncio.Event()
+    approved, answers = [], []
+
+    class SlowApprovals:
+        def approve_appointment(self, app_id):
+            approved.append(app_id)
+
+    def click(data):
+        async def answer(text=None):
+            answers.append((data, text))
+
+        async def edit_message_text(**kwargs):
+            await release.wait()
+
+        message = SimpleNamespace(message_id=7, text_markdown_v2="Özet", reply_markup=None)
+        query = SimpleNamespace(message=message, data=data, answer=answer, edit_message_text=edit_message_text)
+        return SimpleNamespace(callback_query=query)
+
+    context = SimpleNamespace(bot_data={"approval_service": SlowApprovals()})
+    first = asyncio.create_task(dentist_panel.handle_callback_query(click("APPROVE_1"), context))
+    await asyncio.sleep(0)
+
+    # Aynı butonun tekrarı sessizce, başka randevunun butonu yeniden deneme notuyla yanıtlanır
+    await dentist_panel.handle_callback_query(click("APPROVE_1"), context)
+    await dentist_panel.handle_callback_query(click("APPROVE_2"), context)
+    release.set()
+    await first
+
+    assert approved == [1]
+    assert answers == [("APPROVE_1", None), ("APPROVE_1", None), ("APPROVE_2", dentist_panel._BUSY_ANSWER)]
+    assert context.bot_data["callbacks_in_flight"] == {}
+
+    # İlk işlem bitince diğer randevu işlenebilir
+    await dentist_panel.handle_callback_query(click("APPROVE_2"), context)
+    assert approved == [1, 2]
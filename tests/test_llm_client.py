@@ -0,0 +1,98 @@
+import httpx
+import pytest
+
+from dentbot import llm
+from dentbot.llm import GROQ_API_URL, OLLAMA_API_URL, LLMClient
+
+
+class FakeServer:
+    """Groq ve Ollama uç noktalarını taklit eden httpx transport'u."""
+
+    def __init__(self, groq_status=200):
+        self.groq_status = groq_status
+        self.calls = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        self.calls.append(url)
+        if url == GROQ_API_URL:
+            return httpx.Response(self.groq_status, json={"choices": [{"message": {"content": "groq"}}]})
+        if url == OLLAMA_API_URL:
+            return httpx.Response(200, json={"message": {"content": "ollama"}})
+        return httpx.Response(404)
+
+
+def make_client(server: FakeServer) -> LLMClient:
+    client = LLMClient(api_key="test-key", model="test-model", timeout=5)
+    client._client = httpx.Client(transport=httpx.MockTransport(server))
+    return client
+
+
+def test_groq_is_used_when_healthy():
+    server = FakeServer()
+    client = make_client(server)
+
+    assert client.simple_query("Merhaba") == "groq"
+    assert server.calls == [GROQ_API_URL]
+
+
+def test_groq_failure_falls_back_to_ollama():
+    server = FakeServer(groq_status=503)
+    client = make_client(server)
+
+    assert client.chat([{"role": "user", "content": "Merhaba"}], system_prompt="sistem") == "ollama"
+    assert server.calls == [GROQ_API_URL, OLLAMA_API_URL]
+
+
+def test_invalid_groq_response_falls_back_to_ollama():
+    client = LLMClient(api_key="test-key", model="test-model", timeout=5)
+
+    def handler(request):
+        if str(request.url) == GROQ_API_URL:
+            return httpx.Response(200, json={"choices": []})
+        return httpx.Response(200, json={"response": "ollama"})
+
+    client._client = httpx.Client(transport=httpx.MockTransport(handler))
+    assert client.simple_query("Merhaba") == "ollama"
+
+
+def test_circuit_breaker_skips_groq_after_repeated_failures(monkeypatch):
+    monkeypatch.setattr(llm, "GROQ_FAILURE_THRESHOLD", 2)
+    server = FakeServer(groq_status=500)
+    client = make_client(server)
+
+    for _ in range(2):
+        client.simple_query("Merhaba")
+    server.calls.clear()
+
+    # Devre açık: Groq denenmeden doğrudan Ollama
+    assert client.simple_query("Merhaba") == "ollama"
+    assert server.calls == [OLLAMA_API_URL]
+
+    # Bekleme süresi dolunca Groq yeniden denenir ve başarı sayacı sıfırlar
+    client._groq_cooldown_until = 0.0
+    server.groq_status = 200
+    assert client.simple_query("Merhaba") == "groq"
+    assert client._groq_failures == 0
+
+
+def test_ollama_connection_error_is_reported():
+    def handler(request):
+        raise httpx.ConnectError("bağlantı reddedildi", request=request)
+
+    client = LLMClient(api_key="", model="test-model", timeout=5)
+    client._client = httpx.Client(transport=httpx.MockTransport(handler))
+    with pytest.raises(ConnectionError, match="Ollama"):
+        client.simple_query("Merhaba")
+
+
+def test_stream_falls_back_before_first_chunk():
+    def handler(request):
+        if str(request.url) == GROQ_API_URL:
+            return httpx.Response(500)
+        body = b'{"message": {"content": "mer"}}\n{"message": {"content": "haba"}, "done": true}\n'
+        return httpx.Response(200, content=body)
+
+    client = LLMClient(api_key="test-key", model="test-model", timeout=5)
+    client._client = httpx.Client(transport=httpx.MockTransport(handler))
+    assert list(client.chat_stream([{"role": "user", "content": "Merhaba"}])) == ["mer", "haba"]
@@ -0,0 +1,50 @@
+import json
+
+from dentbot.models import Appointment
+
+
+def make_model(**overrides):
+    data = {
+        "dentist_id": 1,
+        "patient_name": "Test_Hasta",
+        "patient_phone": "05551234567",
+        "patient_email": "hasta@example.com",
+        "appointment_date": "2025-11-20",
+        "time_slot": "10:00",
+        "treatment_type": "Dolgu",
+        "duration_minutes": 30,
+        "id": 7,
+    }
+    data.update(overrides)
+    return Appointment(**data)
+
+
+def test_appointment_dict_round_trip():
+    app = make_model()
+    app.patient_name_mdv2  # önbelleğe alınan alanlar to_dict çıktısına girmemeli
+
+    data = app.to_dict()
+    assert "patient_name_mdv2" not in data
+    assert isinstance(data["created_at"], str)
+    assert data["ref_code"] == "APT-000007"
+    assert Appointment.from_dict(data) == app
+
+
+def test_appointment_to_json_matches_dict():
+    app = make_model(patient_name="Çağrı Öz")
+    app.patient_name_mdv2
+
+    payload = app.to_json()
+    assert isinstance(payload, bytes)
+    assert json.loads(payload) == app.to_dict()
+
+
+def test_reference_code_is_not_memoized_before_id_is_assigned():
+    app = make_model(id=None)
+    assert app.ref_code.startswith("TEMP-")
+    assert app.ref_code_mdv2.startswith("TEMP\\-")
+
+    app.id = 12
+    assert app.ref_code == "APT-000012"
+    assert app.ref_code_mdv2 == "APT\\-000012"
+    assert app.get_reference_code() == "APT-000012"
@@ -0,0 +1,138 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import RetryAfter
+
+from dentbot.models import Appointment
+from dentbot.services import notification_service
+from dentbot.services.notification_service import NotificationService, _SendRateLimiter
+
+
+class FakeBot:
+    def __init__(self, failures=None):
+        self.sent = []
+        # chat_id -> sırayla fırlatılacak istisnalar
+        self.failures = failures or {}
+
+    async def send_message(self, **kwargs):
+        pending = self.failures.get(kwargs["chat_id"])
+        if pending:
+            raise pending.pop(0)
+        self.sent.append(kwargs)
+        return kwargs["chat_id"]
+
+
+@pytest.fixture
+def fast_limits(monkeypatch):
+    # Testler Telegram hız sınırını beklemesin
+    monkeypatch.setattr(notification_service, "SEND_MAX_PER_SECOND", 10_000)
+    monkeypatch.setattr(notification_service, "_LIMITERS", {})
+
+
+def test_rate_limiter_spaces_reservations():
+    limiter = _SendRateLimiter(rate=10)
+    waits = [limiter.reserve() for _ in range(3)]
+    assert waits[0] == pytest.approx(0.0, abs=0.01)
+    assert waits[1] == pytest.approx(0.1, abs=0.01)
+    assert waits[2] == pytest.approx(0.2, abs=0.01)
+
+
+def test_rate_limiter_is_shared_per_bot_token(fast_limits):
+    first = NotificationService(SimpleNamespace(token="123:abc"))
+    second = NotificationService(SimpleNamespace(token="123:abc"))
+    other = NotificationService(SimpleNamespace(token="456:def"))
+
+    assert first._limiter is second._limiter
+    assert other._limiter is not first._limiter
+
+
+@pytest.mark.asyncio
+async def test_send_retries_after_flood_limit(fast_limits):
+    bot = FakeBot({1: [RetryAfter(0), RetryAfter(0)]})
+    service = NotificationService(bot)
+
+    assert await service._send(chat_id=1, text="a") == 1
+    assert bot.sent == [{"chat_id": 1, "text": "a"}]
+
+
+@pytest.mark.asyncio
+async def test_send_gives_up_after_max_retries(fast_limits, monkeypatch):
+    monkeypatch.setattr(notification_service, "SEND_MAX_RETRIES", 1)
+    bot = FakeBot({1: [RetryAfter(0), RetryAfter(0)]})
+    service = NotificationService(bot)
+
+    with pytest.raises(RetryAfter):
+        await service._send(chat_id=1, text="a")
+    assert bot.sent == []
+
+
+@pytest.mark.asyncio
+async def test_send_many_isolates_failures(fast_limits):
+    bot = FakeBot({2: [RuntimeError("engellendi")]})
+    service = NotificationService(bot)
+
+    results = await service.send_many([{"chat_id": i, "text": str(i)} for i in (1, 2, 3)])
+    assert results[0] == 1 and results[2] == 3
+    assert isinstance(results[1], RuntimeError)
+    assert [m["chat_id"] for m in bot.sent] == [1, 3]
+
+
+def make_appointment(**overrides):
+    data = dict(
+        id=7, dentist_id=1, patient_name="Ali (Test)", patient_phone="0555",
+        patient_email="a@b.c", appointment_date="2025-11-20", time_slot="10:00",
+        treatment_type="Dolgu", duration_minutes=30,
+    )
+    data.update(overrides)
+    return Appointment(**data)
+
+
+@pytest.mark.asyncio
+async def test_sync_shim_schedules_on_running_loop(fast_limits):
+    bot = FakeBot()
+    service = NotificationService(bot)
+
+    future = service.send_reminder(make_appointment(), 42)
+    await asyncio.wrap_future(future)
+    (message,) = bot.sent
+    assert message["chat_id"] == 42 and "10:00" in message["text"]
+
+
+def test_sync_shim_without_loop_uses_background_loop(fast_limits):
+    bot = FakeBot()
+    service = NotificationService(bot)
+
+    # Servis loop dışında kurulduysa gönderim paylaşılan arka plan loop'unda çalışır
+    assert service.send_cancellation(make_appointment(), 42).result(timeout=5) == 42
+    assert notification_service._background_loop() is notification_service._background_loop()
+
+
+def test_rendered_messages_escape_fields_and_reuse_detail_blocks():
+    notification_service._format_details_cached.cache_clear()
+    app = make_appointment()
+
+    message = notification_service._render(notification_service._CONFIRMATION_TMPL, app)
+    assert "*APT\\-000007*" in message
+    assert "Ali \\(Test\\)" in message and "2025\\-11\\-20" in message
+
+    notification_service._render(notification_service._APPROVED_TMPL, app)
+    assert notification_service._format_details_cached.cache_info().hits == 1
+    # Durum değişince detay bloğu yeniden üretilir
+    app.status = Appointment.STATUS_APPROVED
+    assert "APPROVED" in notification_service._format_appointment_details(app)
+
+
+@pytest.mark.asyncio
+async def test_approval_digest_has_one_button_row_per_appointment(fast_limits):
+    bot = FakeBot()
+    service = NotificationService(bot)
+
+    await service.send_approval_digest_async([make_appointment(id=7), make_appointment(id=8)], 111)
+    (message,) = bot.sent
+    assert message["text"].startswith("🔔 *2 YENİ RANDEVU TALEBİ*")
+    rows = message["reply_markup"].inline_keyboard
+    assert [[b.callback_data for b in row] for row in rows] == [
+        ["APPROVE_7", "REJECT_7"],
+        ["APPROVE_8", "REJECT_8"],
+    ]
@@ -0,0 +1,82 @@
+import os
+import threading
+
+import pytest
+
+from dentbot.adapters.sqlite_adapter import SQLiteAppointmentAdapter
+from dentbot.exceptions import DatabaseError
+
+
+def test_appointment_filters(db, make_dentist, make_appointment):
+    dentist = make_dentist()
+    other = make_dentist(full_name="Mehmet Kaya", is_active=0)
+
+    first = make_appointment(dentist["id"])
+    make_appointment(dentist["id"], time_slot="11:00", appointment_date="2025-11-21")
+    make_appointment(other["id"])
+    db.approve_appointment(first["id"])
+
+    assert len(db.list_dentists()) == 1
+    assert len(db.list_dentists(is_active=False)) == 1
+    assert len(db.list_dentists(is_active=None)) == 2
+
+    assert len(db.list_appointments()) == 3
+    assert len(db.list_appointments(status="approved")) == 1
+
+    assert len(db.list_appointments_by_dentist(dentist["id"])) == 2
+    assert len(db.list_appointments_by_dentist(dentist["id"], status="pending")) == 1
+
+    assert len(db.list_appointments_by_date("2025-11-20")) == 2
+    assert len(db.list_appointments_by_date("2025-11-20", dentist_id=dentist["id"])) == 1
+    # dentist_id=0 bir filtre olarak değerlendirilmeli, "yok" olarak değil
+    assert db.list_appointments_by_date("2025-11-20", dentist_id=0) == []
+
+    booked = db.get_booked_slots("2025-11-20", dentist["id"])
+    assert booked == [{"time_slot": "10:00", "duration_minutes": 30}]
+
+
+def test_transaction_rolls_back_all_writes(db, make_dentist):
+    # Aynı isimli ikinci tedavi UNIQUE kısıtına takılır; bloktaki tüm yazmalar geri alınır
+    with pytest.raises(DatabaseError):
+        with db.transaction():
+            make_dentist()
+            db.create_treatment({"name": "Dolgu", "duration_minutes": 30})
+            db.create_treatment({"name": "Dolgu", "duration_minutes": 30})
+    assert db.list_dentists(is_active=None) == []
+    assert db.list_treatments(is_active=None) == []
+
+    with db.transaction():
+        make_dentist()
+        make_dentist(full_name="Mehmet Kaya")
+    assert len(db.list_dentists()) == 2
+
+
+def test_synchronous_is_opt_in_and_vfs_path_is_quoted(db, db_url, tmp_path):
+    # SQLite varsayılanı FULL (2) korunur
+    assert db._conn().execute("PRAGMA synchronous").fetchone()[0] == 2
+
+    relaxed = SQLiteAppointmentAdapter(db_url + "?synchronous=normal")
+    assert relaxed._conn().execute("PRAGMA synchronous").fetchone()[0] == 1
+    relaxed.close()
+
+    with pytest.raises(DatabaseError):
+        SQLiteAppointmentAdapter(db_url + "?synchronous=sometimes")
+
+    odd_dir = tmp_path / "a#b%c"
+    odd_dir.mkdir()
+    odd = SQLiteAppointmentAdapter(f"sqlite:///{odd_dir}/dentbot.db?vfs=unix")
+    odd.init()
+    assert os.path.exists(odd_dir / "dentbot.db")
+    odd.close()
+
+
+def test_close_releases_connections_from_all_threads(db):
+    worker = threading.Thread(target=db.list_dentists)
+    worker.start()
+    worker.join()
+    assert len(db._connections) == 2
+
+    db.close()
+    assert db._connections == set()
+    # Kapatma sonrası adaptör yeni bağlantıyla çalışmaya devam eder
+    assert db.list_dentists() == []
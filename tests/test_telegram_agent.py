@@ -0,0 +1,420 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from dentbot.channels import telegram
+
+
+class FakeTool:
+    def __init__(self, name, result="sonuç"):
+        self.name = name
+        self.result = result
+        self.calls = []
+
+    async def ainvoke(self, args):
+        self.calls.append(dict(args))
+        return self.result
+
+
+@pytest.fixture
+def tools(monkeypatch):
+    tool_map = {
+        name: FakeTool(name)
+        for name in (
+            "list_dentists",
+            "get_treatment_list",
+            "check_available_slots",
+            "check_availability_by_treatment",
+            "create_appointment_request",
+        )
+    }
+    monkeypatch.setattr(telegram, "get_tool_map_internal", lambda: tool_map)
+    telegram._tool_cache.clear()
+    yield tool_map
+    telegram._tool_cache.clear()
+
+
+def call(name, call_id="1", **args):
+    return {"name": name, "args": args, "id": call_id}
+
+
+@pytest.mark.asyncio
+async def test_read_only_tool_results_are_cached(tools):
+    first = await telegram._invoke_one(call("list_dentists", is_active=True), chat_id=1)
+    second = await telegram._invoke_one(call("list_dentists", "2", is_active=True), chat_id=1)
+
+    assert first.content == second.content == "sonuç"
+    assert second.tool_call_id == "2"
+    assert len(tools["list_dentists"].calls) == 1
+
+    # Farklı argümanlar ayrı anahtardır
+    await telegram._invoke_one(call("list_dentists", is_active=False), chat_id=1)
+    assert len(tools["list_dentists"].calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_recomputed(tools, monkeypatch):
+    monkeypatch.setitem(telegram._TOOL_TTL, "list_dentists", 0)
+    await telegram._invoke_one(call("list_dentists"), chat_id=1)
+    await telegram._invoke_one(call("list_dentists"), chat_id=1)
+    assert len(tools["list_dentists"].calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_write_tools_invalidate_availability(tools):
+    def slots():
+        return call("check_available_slots", dentist_id=1, date="2025-11-20")
+
+    await telegram._invoke_one(slots(), chat_id=1)
+    await telegram._invoke_one(call("list_dentists"), chat_id=1)
+
+    await telegram._invoke_one(call("create_appointment_request", dentist_id=1), chat_id=42)
+    assert tools["create_appointment_request"].calls == [{"dentist_id": 1, "patient_chat_id": 42}]
+    assert [key[0] for key in telegram._tool_cache] == ["list_dentists"]
+
+    await telegram._invoke_one(slots(), chat_id=1)
+    assert len(tools["check_available_slots"].calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_prefetched_result_is_awaited_by_real_call(tools):
+    history = [telegram.AIMessage(content="", tool_calls=[call("list_dentists")])]
+    telegram._prefetch_likely_tools(history)
+    assert isinstance(telegram._tool_cache[("get_treatment_list", "{}")][1], asyncio.Task)
+
+    result = await telegram._invoke_one(call("get_treatment_list"), chat_id=1)
+    assert result.content == "sonuç"
+    assert tools["get_treatment_list"].calls == [{}]
+
+
+@pytest.mark.asyncio
+async def test_prefetch_key_matches_calls_with_default_args(tools):
+    tools["get_treatment_list"].args_schema = telegram.ActiveFilterInput
+    history = [telegram.AIMessage(content="", tool_calls=[call("list_dentists")])]
+    telegram._prefetch_likely_tools(history)
+
+    # LLM varsayılanı açıkça yazsa da prefetch sonucu kullanılır
+    await telegram._invoke_one(call("get_treatment_list", is_active=True), chat_id=1)
+    assert tools["get_treatment_list"].calls == [{}]
+
+
+class FakeLLM:
+    """Sırayla önceden yazılmış AIMessage'ları döndüren model."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.seen = []
+
+    async def ainvoke(self, messages):
+        self.seen.append(list(messages))
+        return self.replies.pop(0)
+
+
+def ai(content="", *tool_calls):
+    return telegram.AIMessage(content=content, tool_calls=list(tool_calls))
+
+
+@pytest.fixture
+def agent(tools, monkeypatch):
+    """Sahte modelle çalışan agent; (llm'i kuran fonksiyon, user_data) döner."""
+    telegram._response_cache.clear()
+    context = SimpleNamespace(user_data={})
+
+    def use(*replies):
+        llm = FakeLLM(*replies)
+        monkeypatch.setattr(telegram, "get_llm_with_tools", lambda: llm)
+        monkeypatch.setattr(telegram, "get_llm", lambda: llm)
+        return llm
+
+    yield use, context
+    telegram._response_cache.clear()
+
+
+def test_response_cache_key_changes_with_the_hour(monkeypatch):
+    class Clock:
+        now_value = datetime(2025, 11, 20, 9, 5)
+
+        @classmethod
+        def now(cls):
+            return cls.now_value
+
+    monkeypatch.setattr(telegram, "datetime", Clock)
+    key = telegram._response_cache_key("Doktorlar kim?", [])
+    Clock.now_value = datetime(2025, 11, 20, 9, 55)
+    assert telegram._response_cache_key("Doktorlar kim?", []) == key
+    Clock.now_value = datetime(2025, 11, 20, 10, 0)
+    assert telegram._response_cache_key("Doktorlar kim?", []) != key
+
+
+@pytest.mark.asyncio
+async def test_only_catalog_tool_turns_are_cached(agent):
+    use, context = agent
+    use(ai("", call("list_dentists", is_active=True)), ai("Dr. Ayşe"))
+    assert await telegram.handle_message_with_agent("Doktorlar kim?", 1, context) == "Dr. Ayşe"
+
+    # Aynı soru yeni bir oturumda modele gitmeden önbellekten yanıtlanır
+    llm = use()
+    fresh = SimpleNamespace(user_data={})
+    assert await telegram.handle_message_with_agent("Doktorlar kim?", 2, fresh) == "Dr. Ayşe"
+    assert llm.seen == []
+
+    # Araçsız yanıt saat bağlamına dayanabilir; önbelleğe alınmaz
+    use(ai("Evet, açığız."))
+    await telegram.handle_message_with_agent("Şu an açık mısınız?", 3, SimpleNamespace(user_data={}))
+    llm = use(ai("Hayır, kapalıyız."))
+    reply = await telegram.handle_message_with_agent("Şu an açık mısınız?", 4, SimpleNamespace(user_data={}))
+    assert reply == "Hayır, kapalıyız." and len(llm.seen) == 1
+
+
+class FakeMessage:
+    def __init__(self, fail_on=()):
+        self.sent = []
+        self.fail_on = set(fail_on)
+
+    async def reply_text(self, text, **kwargs):
+        index = len(self.sent)
+        self.sent.append(text)
+        # İlk parça en yavaş gitse bile sıra korunmalı
+        await asyncio.sleep(0.01 if index == 0 else 0)
+        if index in self.fail_on:
+            raise RuntimeError("gönderilemedi")
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_sent_in_order_without_generic_error():
+    message = FakeMessage(fail_on={1})
+    update = SimpleNamespace(message=message)
+    parts = ["a" * 2000, "b" * 2040, "c" * 10]
+
+    await telegram._send_chunks(update, None, "\n".join(parts), chat_id=1)
+    assert message.sent == parts
+
+
+@pytest.mark.asyncio
+async def test_generic_error_only_when_nothing_was_delivered():
+    message = FakeMessage(fail_on={0})
+    update = SimpleNamespace(message=message)
+
+    await telegram._send_chunks(update, None, "kısa", chat_id=1)
+    assert message.sent == ["kısa", telegram.GENERIC_ERROR_MDV2]
+
+
+@pytest.mark.asyncio
+async def test_three_step_booking_completes_within_the_tool_loop(agent, tools):
+    use, context = agent
+    llm = use(
+        ai("", call("check_availability_by_treatment", "1", treatment_name="Dolgu", date="2025-11-20")),
+        ai("", call("check_available_slots", "2", dentist_id=1, date="2025-11-20")),
+        ai("", call("create_appointment_request", "3", dentist_id=1, time_slot="10:00")),
+        ai("Randevu talebiniz alındı."),
+    )
+
+    reply = await telegram.handle_message_with_agent("Yarın 10:00 dolgu randevusu", 42, context)
+    assert reply == "Randevu talebiniz alındı."
+    assert tools["create_appointment_request"].calls == [
+        {"dentist_id": 1, "time_slot": "10:00", "patient_chat_id": 42}
+    ]
+    assert llm.replies == []
+
+
+@pytest.mark.asyncio
+async def test_timed_out_turn_is_rolled_back_from_history(agent, tools):
+    use, context = agent
+
+    async def slow(args):
+        await asyncio.sleep(1)
+
+    tools["check_available_slots"].ainvoke = slow
+    use(ai("", call("check_available_slots", dentist_id=1, date="2025-11-20")))
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(
+            telegram.handle_message_with_agent("Yarın boş saat var mı?", 1, context), timeout=0.05
+        )
+    assert list(context.user_data["history"]) == []
+
+    # Sonraki tur, yanıtsız tool_calls içermeyen geçerli bir listeyle başlar
+    llm = use(ai("Tekrar deneyelim."))
+    assert await telegram.handle_message_with_agent("Tekrar dener misin?", 1, context) == "Tekrar deneyelim."
+    (sent,) = llm.seen
+    assert not any(isinstance(m, telegram.AIMessage) and m.tool_calls for m in sent)
+
+
+@pytest.mark.asyncio
+async def test_timed_out_waiter_does_not_cancel_shared_prefetch(tools):
+    release = asyncio.Event()
+
+    async def slow(args):
+        await release.wait()
+        return "tedaviler"
+
+    tools["get_treatment_list"].ainvoke = slow
+    telegram._prefetch_likely_tools([telegram.AIMessage(content="", tool_calls=[call("list_dentists")])])
+
+    # A'nın turu zaman aşımına uğrar; paylaşılan prefetch görevi B için çalışmaya devam eder
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(telegram._invoke_one(call("get_treatment_list"), chat_id=1), timeout=0.01)
+    waiting_b = asyncio.create_task(telegram._invoke_one(call("get_treatment_list"), chat_id=2))
+    await asyncio.sleep(0)
+    release.set()
+    assert (await waiting_b).content == "tedaviler"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_prefetch_is_treated_as_a_miss(tools):
+    telegram._prefetch_likely_tools([telegram.AIMessage(content="", tool_calls=[call("list_dentists")])])
+    key = ("get_treatment_list", "{}")
+    task = telegram._tool_cache[key][1]
+    task.cancel()
+    await asyncio.sleep(0)
+
+    result = await telegram._invoke_one(call("get_treatment_list"), chat_id=1)
+    assert result.content == "sonuç"
+    assert telegram._tool_cache[key][1] == "sonuç"
+
+
+@pytest.mark.asyncio
+async def test_prefetch_entries_respect_the_cache_bound(tools, monkeypatch):
+    monkeypatch.setattr(telegram, "TOOL_CACHE_MAX_ENTRIES", 2)
+    await telegram._invoke_one(call("check_available_slots", dentist_id=1, date="2025-11-20"), chat_id=1)
+    await telegram._invoke_one(call("check_available_slots", dentist_id=2, date="2025-11-20"), chat_id=1)
+
+    telegram._prefetch_likely_tools([telegram.AIMessage(content="", tool_calls=[call("list_dentists")])])
+    assert len(telegram._tool_cache) == 2
+    assert ("get_treatment_list", "{}") in telegram._tool_cache
+    await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_confirmation_mid_booking_reaches_the_model(agent, tools):
+    use, context = agent
+    use(ai("Dr. Ayşe için yarın 10:00 uygun. Randevuyu oluşturayım mı?"))
+    await telegram.handle_message_with_agent("Yarın dolgu için yer var mı?", 1, context)
+
+    use(
+        ai("", call("create_appointment_request", dentist_id=1, time_slot="10:00")),
+        ai("Randevu talebiniz alındı."),
+    )
+    assert await telegram.handle_message_with_agent("Tamam", 1, context) == "Randevu talebiniz alındı."
+    assert len(tools["create_appointment_request"].calls) == 1
+
+    # Soru bekleyen bir akışta selamlaşma bile modele gider
+    llm = use(ai("Randevunuz oluşturuldu. Başka bir isteğiniz var mı?"), ai("Tekrar merhaba!"))
+    await telegram.handle_message_with_agent("Teşekkürler", 1, context)
+    assert await telegram.handle_message_with_agent("Merhaba", 1, context) == "Tekrar merhaba!"
+    assert llm.replies == []
+
+
+@pytest.mark.asyncio
+async def test_greeting_without_pending_question_skips_the_model(agent):
+    use, context = agent
+    llm = use()
+    reply = await telegram.handle_message_with_agent("Merhaba!", 1, context)
+    assert reply == telegram._SMALL_TALK["merhaba"] and llm.seen == []
+
+
+class StreamingLLM(FakeLLM):
+    """Yanıtları parça parça akıtan model; boş liste boş akış demektir."""
+
+    def __init__(self, *streams, replies=()):
+        super().__init__(*replies)
+        self.streams = list(streams)
+
+    async def astream(self, messages):
+        self.seen.append(list(messages))
+        for piece in self.streams.pop(0):
+            yield AIMessageChunk(content=piece)
+            await asyncio.sleep(0)
+
+
+class FakeSentMessage:
+    def __init__(self, text):
+        self.text = text
+        self.edits = []
+
+    async def edit_text(self, text, **kwargs):
+        self.edits.append((text, kwargs.get("parse_mode")))
+        if text == self.text:
+            raise RuntimeError("Message is not modified: specified new message content is the same")
+        self.text = text
+
+
+class FakeChatMessage:
+    def __init__(self, text):
+        self.text = text
+        self.sent = []
+
+    async def reply_text(self, text, **kwargs):
+        self.sent.append(FakeSentMessage(text))
+        return self.sent[-1]
+
+
+@pytest.fixture
+def streaming(agent, monkeypatch):
+    """message_handler'ı akış yapan sahte modelle çalıştırır; gönderilen mesajları döner."""
+    _, context = agent
+    monkeypatch.setattr(telegram, "STREAM_EDIT_INTERVAL", 0)
+
+    async def send(user_text, llm):
+        monkeypatch.setattr(telegram, "get_llm_with_tools", lambda: llm)
+        message = FakeChatMessage(user_text)
+
+        async def send_chat_action(**kwargs):
+            pass
+
+        update = SimpleNamespace(message=message, effective_chat=SimpleNamespace(id=1))
+        handler_context = SimpleNamespace(user_data=context.user_data, bot=SimpleNamespace(send_chat_action=send_chat_action))
+        await telegram.message_handler(update, handler_context)
+        return message.sent
+
+    return send
+
+
+@pytest.mark.asyncio
+async def test_streamed_reply_is_previewed_then_finalized(streaming):
+    sent = await streaming("Yarın uygun mu?", StreamingLLM(["Yarın ", "saat 10", " uygun."]))
+
+    # Tek mesaj açılır; ara önizlemeler düz metin, son hali MarkdownV2 düzenlemesidir
+    assert len(sent) == 1
+    placeholder = sent[0]
+    assert [parse_mode for _, parse_mode in placeholder.edits[:-1]] == [None] * (len(placeholder.edits) - 1)
+    assert len(placeholder.edits) >= 2
+    assert placeholder.edits[-1] == (telegram.escape_markdown_v2("Yarın saat 10 uygun."), "MarkdownV2")
+
+
+@pytest.mark.asyncio
+async def test_unchanged_final_edit_is_not_reported_as_error(streaming):
+    sent = await streaming("Not alır mısınız?", StreamingLLM(["Tamam", " not aldım"]))
+
+    # Önizleme son metinle aynı; Telegram'ın "not modified" yanıtı hata sayılmaz
+    assert len(sent) == 1
+    assert sent[0].text == "Tamam not aldım"
+    assert sent[0].edits[-1] == ("Tamam not aldım", "MarkdownV2")
+
+
+@pytest.mark.asyncio
+async def test_empty_stream_falls_back_to_a_single_request(streaming):
+    llm = StreamingLLM([], replies=[ai("Pazartesi açığız.")])
+    sent = await streaming("Pazartesi açık mısınız?", llm)
+
+    assert [m.text for m in sent] == [telegram.escape_markdown_v2("Pazartesi açığız.")]
+    assert llm.replies == []
+
+
+@pytest.mark.asyncio
+async def test_partial_updates_do_not_hold_the_llm_semaphore(monkeypatch):
+    semaphore = asyncio.Semaphore(1)
+    monkeypatch.setattr(telegram, "_LLM_SEMAPHORE", semaphore)
+    release = asyncio.Event()
+
+    async def slow_partial(text):
+        await release.wait()
+
+    task = asyncio.create_task(telegram._stream_ai_message(StreamingLLM(["a", "b"]), [], slow_partial))
+    await asyncio.sleep(0.01)
+    # Telegram düzenlemesi takılı kalsa da akış bitince semafor serbest kalır
+    assert not semaphore.locked() and not task.done()
+    release.set()
+    assert (await task).content == "ab"